@@ -2,8 +2,20 @@
 dynamic_fanout_dispatcher.py
 
 Reads block file paths from an input FIFO (inf) and distributes each
-path to one of w output FIFOs based on the index i extracted from
-"blk{i}.txt", using i % w.
+path to one of w output FIFOs. The output FIFO is chosen by the
+dispatch policy given with --policy:
+
+    modulo          index i extracted from "blk{i}.txt", using i % w
+                    (default; paths without index are skipped)
+    round-robin     output FIFOs are used in turn
+    least-queued    output FIFO with the fewest lines queued and not
+                    yet written
+    work-stealing   round-robin, and feeders without queued lines take
+                    lines queued for the feeder with the most of them
+
+Except for modulo, the policies do not use the index, so every path is
+dispatched, and the work is shared according to how fast each worker
+reads instead of being fixed in advance.
 
 Each output FIFO is served by its own WorkerFeeder thread with plain
 blocking I/O. Opening a FIFO for writing blocks until a reader connects;
@@ -15,6 +27,62 @@ processes (e.g. bash scripts), this program does not run them. Each
 WorkerFeeder is just the thread on our side that owns the connection to
 one worker's input FIFO and writes block paths to it.
 
+With --batch, the input is read in chunks of the lines available, the
+lines of each chunk going to the same WorkerFeeder are queued at once,
+and each WorkerFeeder drains all the lines queued when it wakes up and
+writes them with os.write, in chunks of whole lines of at most PIPE_BUF
+bytes (so each chunk is written atomically). With --max-latency, a
+feeder waits up to the given number of seconds for more lines before
+writing a batch smaller than PIPE_BUF bytes, trading latency for fewer
+writes.
+
+With --engine selectors, a single thread serves the input FIFO and all
+the output FIFOs using a selectors event loop, instead of one
+WorkerFeeder thread per output FIFO. Output FIFOs are opened with
+O_NONBLOCK, retrying every RETRY_OPEN_INTERVAL seconds while they have
+no reader (ENXIO), and each one has its own write buffer. Reading from
+the input FIFO is paused while some buffer holds more than
+OUTPUT_BUFFER_HIGH_WATER bytes. The input FIFO is opened with a
+blocking open (a non-blocking one would report end of file until the
+producer opens it), which does not delay the workers, since the output
+FIFOs are only written once some input is available. Lines are read
+and written in batches as in --batch mode, which is ignored together
+with --max-latency.
+
+With --high-water, at most the given number of lines can be queued for
+each worker (and not yet written to its FIFO). When a line should be
+queued for a worker that reached that mark, reading from the input
+FIFO is paused until the worker makes progress, so the producer is
+slowed down through the input FIFO instead of the dispatcher buffering
+the whole input. The selectors engine checks the mark after
+dispatching each chunk read from the input, so a worker may exceed it
+by the lines of one chunk. How many times and for how long reading was
+paused is logged at the end.
+
+With --stats-out, statistics are written every --stats-interval seconds
+to the given file or FIFO (opening a FIFO waits for its reader in a
+separate thread, as for the output FIFOs), plus a last record when the
+dispatcher finishes. Each record is a JSON object on its own line:
+
+    time, elapsed       wall-clock time and seconds since start
+    final               true for the last record
+    lines_in            lines read from the input FIFO (lines_skipped
+                        of them were not dispatched)
+    lines_out           lines written to the output FIFOs
+    lines_in_per_s,     rates since the previous record
+    lines_out_per_s
+    workers             one object per output FIFO with its path,
+                        whether it is connected, open_wait (seconds
+                        blocked opening the FIFO until its reader
+                        connected, so far if still waiting), depth
+                        (lines queued and not yet written),
+                        lines_written, lines_stolen, and latency, a
+                        histogram of the seconds from queuing each line
+                        to writing it: counts[i] lines took at most
+                        bounds[i] seconds (and more than bounds[i-1]),
+                        the last count being for longer latencies.
+                        Counts are cumulative since start.
+
 Output FIFO paths are passed individually as -outf0, -outf1, ...,
 -outf{w-1}. Logging goes to stderr; verbosity is controlled with
 --log-level (use CRITICAL to effectively silence normal output while
@@ -22,15 +90,47 @@ still surfacing critical failures).
 """
 
 import argparse
+import bisect
+import collections
+import json
 import logging
 import os
 import queue
+import errno
+import heapq
 import re
+import select
+import selectors
 import sys
 import threading
+import time
 
 BLOCK_RE = re.compile(r"blk(\d+)\.txt$")
 
+# Writes of at most PIPE_BUF bytes to a pipe are atomic
+PIPE_BUF = select.PIPE_BUF
+
+# Maximum number of bytes read from the input FIFO at once in batch mode
+INPUT_CHUNK_SIZE = 65536
+
+# Seconds a feeder without queued lines waits before trying to steal
+# lines from other feeders (work-stealing policy)
+STEAL_INTERVAL = 0.05
+
+# Seconds between attempts to open output FIFOs without reader, and
+# bytes buffered for an output FIFO above which reading from the input
+# FIFO is paused (selectors engine)
+RETRY_OPEN_INTERVAL = 0.05
+OUTPUT_BUFFER_HIGH_WATER = 1 << 20
+
+# Seconds between checks of whether a feeder is still alive while
+# waiting for it to have space for more lines
+BACKPRESSURE_CHECK_INTERVAL = 0.5
+
+# Upper bounds in seconds of the buckets of the enqueue-to-write latency
+# histograms (statistics)
+LATENCY_BUCKET_BOUNDS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+
 log = logging.getLogger("distribute_blocks")
 
 
@@ -81,12 +181,40 @@ def parse_args():
                          choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
                          help="Logging verbosity (default: INFO). Use CRITICAL to "
                               "effectively silence normal output.")
+    parser.add_argument("--policy", default="modulo", choices=list(POLICIES),
+                         help="Dispatch policy (default: modulo).")
+    parser.add_argument("--engine", default="threads", choices=["threads", "selectors"],
+                         help="Use a thread per output FIFO or a single "
+                              "selectors event loop (default: threads).")
+    parser.add_argument("--high-water", type=int, default=0,
+                         help="Maximum number of lines queued for a worker before "
+                              "reading from the input FIFO is paused (default: 0, "
+                              "no limit; the selectors engine then pauses when a "
+                              "worker has more than %d bytes buffered)." % OUTPUT_BUFFER_HIGH_WATER)
+    parser.add_argument("--stats-out", default=None,
+                         help="File or FIFO where statistics are periodically written "
+                              "as JSON lines (default: no statistics).")
+    parser.add_argument("--stats-interval", type=float, default=1.0,
+                         help="Seconds between statistics records (default: 1).")
+    parser.add_argument("--batch", action="store_true",
+                         help="Write all the lines queued for a worker at once, "
+                              "in chunks of at most PIPE_BUF bytes.")
+    parser.add_argument("--max-latency", type=float, default=0.0,
+                         help="Seconds a batch smaller than PIPE_BUF bytes may wait "
+                              "for more lines before being written (default: 0, "
+                              "only used with --batch).")
 
     for i in range(w):
         parser.add_argument(f"-outf{i}", required=True,
                              help=f"Path to output FIFO for worker {i}.")
 
     args = parser.parse_args()
+    if args.max_latency < 0:
+        parser.error("--max-latency must not be negative")
+    if args.high_water < 0:
+        parser.error("--high-water must not be negative")
+    if args.stats_interval <= 0:
+        parser.error("--stats-interval must be positive")
 
     # Collect outf0..outf{w-1} into an ordered list for the rest of the program
     outf_paths = [getattr(args, f"outf{i}") for i in range(w)]
@@ -96,11 +224,27 @@ def parse_args():
 
 def extract_index(path):
     """Extract the integer i from a path ending in blk{i}.txt."""
-    base = os.path.basename(path)
-    m = BLOCK_RE.search(base)
+    # BLOCK_RE is anchored at the end and cannot match "/", so searching
+    # the whole path is equivalent to searching its basename
+    m = BLOCK_RE.search(path)
     return int(m.group(1)) if m else None
 
 
+class LatencyHistogram:
+    """Counts of latencies in the buckets given by LATENCY_BUCKET_BOUNDS,
+    plus one for longer latencies. It is only updated by one thread, and
+    the statistics reporter just reads the counts."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKET_BOUNDS) + 1)
+
+    def add(self, seconds, n=1):
+        self.counts[bisect.bisect_left(LATENCY_BUCKET_BOUNDS, seconds)] += n
+
+    def to_dict(self):
+        return {"bounds": list(LATENCY_BUCKET_BOUNDS), "counts": list(self.counts)}
+
+
 class WorkerFeeder(threading.Thread):
     """
     Feeds one external worker process with block paths, through its
@@ -114,35 +258,366 @@ class WorkerFeeder(threading.Thread):
     Runs in its own thread because opening a FIFO for writing blocks
     until a reader connects; keeping that wait in its own thread means
     it never stalls the rest of the program.
+
+    In batch mode, lines are written in batches (see run_batched)
+    instead of one write + flush per line.
+
+    With steal=True, when the feeder has no queued lines it takes the
+    next element queued for the peer feeder with the most queued lines.
+
+    With high_water > 0, wait_for_space blocks the caller while
+    high_water lines are queued and not yet written.
+
+    Queued elements are (enqueue time, line) pairs, or (enqueue time,
+    list of lines) in batch mode, so the latency of each line from
+    being queued to being written can be measured.
     """
 
-    def __init__(self, path):
+    def __init__(self, path, batch=False, max_latency=0.0, steal=False, high_water=0):
         super().__init__(daemon=True, name=f"feeder-{os.path.basename(path)}")
         self.path = path
         self.q = queue.Queue()
+        self.batch = batch
+        self.max_latency = max_latency
+        self.steal = steal
+        self.peers = []
         self.lines_written = 0
+        self.writes = 0
+        self.lines_stolen = 0
+        self.high_water = high_water
+        self.backpressure_count = 0
+        self.backpressure_time = 0.0
+        self.latency = LatencyHistogram()
+        self.open_start = None
+        self.open_end = None
+
+        # Lines given to this feeder, including the ones stolen from
+        # peers and excluding the ones stolen by them. It is updated by
+        # several threads, so it is protected by a condition, which is
+        # also used to wait for the feeder to have space for more lines
+        self.lines_queued = 0
+        self.lines_queued_cond = threading.Condition()
+
+        # Deque where the feeder is appended when its depth decreases,
+        # set by policies keeping track of depths (see LeastQueuedPolicy)
+        self.depth_decreases = None
+
+    def add_lines_queued(self, n):
+        with self.lines_queued_cond:
+            self.lines_queued += n
+            if n < 0 and self.high_water > 0:
+                self.lines_queued_cond.notify_all()
+        if n < 0 and self.depth_decreases is not None:
+            self.depth_decreases.append(self)
+
+    def add_lines_written(self, n):
+        # Only the feeder thread writes lines, so no lock is needed to
+        # update the counter
+        self.lines_written += n
+        if self.depth_decreases is not None:
+            self.depth_decreases.append(self)
+        if self.high_water > 0:
+            with self.lines_queued_cond:
+                self.lines_queued_cond.notify_all()
+
+    def wait_for_space(self):
+        """Block while high_water lines are queued and not yet written,
+        recording how often and for how long it happened."""
+        if self.high_water <= 0 or self.depth() < self.high_water:
+            return
+        log.debug("%s reached high-water mark, pausing input", os.path.basename(self.path))
+        start = time.monotonic()
+        self.backpressure_count += 1
+        with self.lines_queued_cond:
+            # The feeder could die while waiting (e.g. its reader closed
+            # the FIFO), so it is checked periodically
+            while self.depth() >= self.high_water and self.is_alive():
+                self.lines_queued_cond.wait(BACKPRESSURE_CHECK_INTERVAL)
+        self.backpressure_time += time.monotonic() - start
+
+    def depth(self):
+        """Number of lines given to this feeder and not yet written."""
+        return self.lines_queued - self.lines_written
+
+    def open_wait(self):
+        """Seconds spent blocked opening the FIFO until its reader
+        connected (so far, if it is still waiting)."""
+        if self.open_start is None:
+            return 0.0
+        end = self.open_end if self.open_end is not None else time.monotonic()
+        return end - self.open_start
 
     def queue_line(self, line: str):
-        self.q.put(line)
+        self.add_lines_queued(1)
+        self.q.put((time.monotonic(), line))
+
+    def queue_lines(self, lines, counted=False):
+        """Queue list of lines at once (batch mode). If counted is True,
+        the lines were already added to lines_queued."""
+        if not counted:
+            self.add_lines_queued(len(lines))
+        self.q.put((time.monotonic(), lines))
+
+    def get_item(self, timeout=None):
+        """Return next queued element (see class documentation) or the
+        sentinel. If stealing is enabled, elements of the
+        peers are taken while the own queue is empty, including after
+        the sentinel is received, so the feeders that finish first
+        help with the remaining lines. Raise queue.Empty if nothing
+        was obtained within timeout seconds."""
+        if not self.steal:
+            return self.q.get(timeout=timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = STEAL_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+            try:
+                item = self.q.get(timeout=max(wait, 0))
+            except queue.Empty:
+                item = self.steal_item()
+                if item is not None:
+                    return item
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+                continue
+            if item is None:
+                stolen = self.steal_item()
+                if stolen is not None:
+                    self.q.put(None)  # keep the sentinel for later
+                    return stolen
+            return item
+
+    def steal_item(self):
+        """Take next element queued for the peer with the most queued
+        lines. Return None if there is nothing to steal."""
+        victim = max(self.peers, key=lambda peer: peer.depth(), default=None)
+        if victim is None or victim is self or victim.depth() <= 0:
+            return None
+        try:
+            item = victim.q.get_nowait()
+        except queue.Empty:
+            return None
+        if item is None:
+            victim.q.put(None)  # the sentinel belongs to the victim
+            return None
+        n = len(item[1]) if isinstance(item[1], list) else 1
+        victim.add_lines_queued(-n)
+        self.add_lines_queued(n)
+        self.lines_stolen += n
+        log.debug("Stole %d lines from %s", n, os.path.basename(victim.path))
+        return item
 
     def stop(self):
         self.q.put(None)  # sentinel: tells the thread to finish and exit
 
     def run(self):
+        if self.batch:
+            self.run_batched()
+            return
+
         log.debug("Waiting for a reader on %s", self.path)
         # Blocking open: this line waits here until the worker process
         # opens the other end for reading. Since we're in our own
         # thread, this doesn't block the rest of the program.
+        self.open_start = time.monotonic()
         with open(self.path, "w") as f:
-            log.info("Connected to %s", self.path)
+            self.open_end = time.monotonic()
+            log.info("Connected to %s after %.3fs", self.path, self.open_wait())
             while True:
-                line = self.q.get()
-                if line is None:  # sentinel received: no more lines coming
+                item = self.get_item()
+                if item is None:  # sentinel received: no more lines coming
                     break
+                enqueued, line = item
                 f.write(line + "\n")
                 f.flush()
-                self.lines_written += 1
-        log.info("Closed %s (%d lines written)", self.path, self.lines_written)
+                self.add_lines_written(1)
+                self.latency.add(time.monotonic() - enqueued)
+        log.info("Closed %s (%d lines written, %d stolen, backpressure %d times for %.3fs)", self.path,
+                 self.lines_written, self.lines_stolen, self.backpressure_count, self.backpressure_time)
+
+    def next_batch(self):
+        """Block until lines are queued, then return them together with
+        all the lines queued meanwhile. If the batch is smaller than
+        PIPE_BUF bytes, wait up to max_latency seconds for more lines.
+        Return (lines, enqueue times, done) tuple, enqueue times being a
+        list of (enqueue time, number of lines) pairs and done being True
+        if the sentinel was received."""
+        item = self.get_item()
+        if item is None:
+            return [], [], True
+        enqueued, lines = item
+        batch = list(lines)
+        enqueue_times = [(enqueued, len(lines))]
+        nbytes = sum(len(line) + 1 for line in lines)
+        deadline = time.monotonic() + self.max_latency
+        while True:
+            # With stealing, lines beyond PIPE_BUF bytes are left queued
+            # so idle peers can take them while this batch is written
+            if self.steal and nbytes >= PIPE_BUF:
+                return batch, enqueue_times, False
+            try:
+                item = self.q.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or nbytes >= PIPE_BUF:
+                    return batch, enqueue_times, False
+                try:
+                    item = self.get_item(timeout=remaining)
+                except queue.Empty:
+                    return batch, enqueue_times, False
+            if item is None:
+                return batch, enqueue_times, True
+            enqueued, lines = item
+            batch.extend(lines)
+            enqueue_times.append((enqueued, len(lines)))
+            if nbytes < PIPE_BUF:
+                nbytes += sum(len(line) + 1 for line in lines)
+
+    def write_lines(self, fd, lines):
+        """Write lines in chunks of whole lines of at most PIPE_BUF
+        bytes. Lines longer than that are written on their own."""
+        chunk = bytearray()
+        for line in lines:
+            data = (line + "\n").encode()
+            if chunk and len(chunk) + len(data) > PIPE_BUF:
+                self.write_all(fd, chunk)
+                chunk = bytearray()
+            chunk += data
+        if chunk:
+            self.write_all(fd, chunk)
+        self.add_lines_written(len(lines))
+
+    def write_all(self, fd, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+            self.writes += 1
+
+    def run_batched(self):
+        log.debug("Waiting for a reader on %s", self.path)
+        # Blocking open, as in run()
+        self.open_start = time.monotonic()
+        fd = os.open(self.path, os.O_WRONLY)
+        self.open_end = time.monotonic()
+        try:
+            log.info("Connected to %s after %.3fs", self.path, self.open_wait())
+            while True:
+                batch, enqueue_times, done = self.next_batch()
+                if batch:
+                    self.write_lines(fd, batch)
+                    now = time.monotonic()
+                    for enqueued, n in enqueue_times:
+                        self.latency.add(now - enqueued, n)
+                if done:
+                    break
+        finally:
+            os.close(fd)
+        log.info("Closed %s (%d lines written, %d stolen, %d writes, backpressure %d times for %.3fs)",
+                 self.path, self.lines_written, self.lines_stolen, self.writes, self.backpressure_count,
+                 self.backpressure_time)
+
+
+class ModuloPolicy:
+    """Route each path by its block index modulo the number of
+    feeders. Paths without index cannot be routed."""
+
+    steal = False
+
+    def __init__(self, feeders):
+        self.feeders = feeders
+
+    def select(self, line):
+        idx = extract_index(line)
+        return None if idx is None else self.feeders[idx % len(self.feeders)]
+
+
+class RoundRobinPolicy:
+    """Route paths to the feeders in turn."""
+
+    steal = False
+
+    def __init__(self, feeders):
+        self.feeders = feeders
+        self.next = 0
+
+    def select(self, line):
+        feeder = self.feeders[self.next]
+        self.next = (self.next + 1) % len(self.feeders)
+        return feeder
+
+
+class LeastQueuedPolicy:
+    """Route each path to the feeder with the fewest lines queued and
+    not yet written (the first one in case of a tie).
+
+    Feeders are kept in a heap of (depth, index, version) entries, only
+    the entry with the latest version of each feeder being valid. Depths
+    grow when lines are dispatched, which is fixed when the entry of the
+    feeder reaches the top of the heap, and decrease when lines are
+    written or stolen, which feeders report through depth_decreases so
+    their entries are updated before the next selection. Each selection
+    costs O(log w) amortized."""
+
+    steal = False
+
+    def __init__(self, feeders):
+        self.feeders = feeders
+        self.index = {feeder: i for i, feeder in enumerate(feeders)}
+        self.depth_decreases = collections.deque()
+        for feeder in feeders:
+            feeder.depth_decreases = self.depth_decreases
+        self.rebuild()
+
+    def rebuild(self):
+        self.versions = [0] * len(self.feeders)
+        self.heap = [(feeder.depth(), i, 0) for i, feeder in enumerate(self.feeders)]
+        heapq.heapify(self.heap)
+
+    def update(self, i):
+        self.versions[i] += 1
+        heapq.heappush(self.heap, (self.feeders[i].depth(), i, self.versions[i]))
+
+    def select(self, line):
+        # Update entries of feeders whose depth decreased. Feeders keep
+        # appending to the deque meanwhile, so only the elements present
+        # now are taken
+        if self.depth_decreases:
+            decreased = set()
+            for _ in range(len(self.depth_decreases)):
+                decreased.add(self.index[self.depth_decreases.popleft()])
+            for i in decreased:
+                self.update(i)
+
+            # Discard invalid entries once they outnumber the valid ones
+            if len(self.heap) > 2 * len(self.feeders):
+                self.rebuild()
+
+        while True:
+            depth, i, version = self.heap[0]
+            if version != self.versions[i]:
+                heapq.heappop(self.heap)
+                continue
+            current = self.feeders[i].depth()
+            if current == depth:
+                return self.feeders[i]
+            self.versions[i] += 1
+            heapq.heapreplace(self.heap, (current, i, self.versions[i]))
+
+
+class WorkStealingPolicy(RoundRobinPolicy):
+    """Route paths in turn; idle feeders steal from the busiest one."""
+
+    steal = True
+
+
+POLICIES = {
+    "modulo": ModuloPolicy,
+    "round-robin": RoundRobinPolicy,
+    "least-queued": LeastQueuedPolicy,
+    "work-stealing": WorkStealingPolicy,
+}
 
 
 def read_input_lines(inf_path):
@@ -154,33 +629,487 @@ def read_input_lines(inf_path):
             yield line.rstrip("\n")
 
 
+def read_input_chunks(inf_path):
+    """Generator that yields lists with the complete lines available in
+    the input FIFO, reading at most INPUT_CHUNK_SIZE bytes at once.
+    os.read returns as soon as some data is available, so lines are not
+    delayed waiting for a full chunk."""
+    fd = os.open(inf_path, os.O_RDONLY)
+    try:
+        pending = b""
+        while True:
+            data = os.read(fd, INPUT_CHUNK_SIZE)
+            if not data:
+                break
+            data = pending + data
+            end = data.rfind(b"\n")
+            if end < 0:
+                pending = data
+                continue
+            pending = data[end + 1:]
+            yield data[:end].decode().split("\n")
+        if pending:
+            yield [pending.decode()]
+    finally:
+        os.close(fd)
+
+
+def queue_dispatched_lines(lines_by_feeder):
+    for feeder, feeder_lines in lines_by_feeder.items():
+        log.debug("Dispatching %d lines -> %s", len(feeder_lines), os.path.basename(feeder.path))
+        feeder.queue_lines(feeder_lines, counted=True)
+    lines_by_feeder.clear()
+
+
+def dispatch_lines(lines, feeders, policy, wait_for_space=False):
+    """Dispatch lines to the feeders, queuing the lines of each feeder
+    at once. If wait_for_space is True, when a feeder reaches its
+    high-water mark the lines dispatched so far are queued and the
+    caller waits until the feeder has space. Return (lines read, lines
+    skipped) pair."""
+    lines_by_feeder = {}
+    lines_read = 0
+    lines_skipped = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        lines_read += 1
+        feeder = policy.select(line)
+        if feeder is None:
+            log.warning("Could not parse index from '%s', skipping", line)
+            lines_skipped += 1
+            continue
+        if feeder not in lines_by_feeder:
+            lines_by_feeder[feeder] = []
+        lines_by_feeder[feeder].append(line)
+        # Count line right away, so the policy takes into account the
+        # lines of this chunk that are not queued yet
+        feeder.add_lines_queued(1)
+        if wait_for_space and 0 < feeder.high_water <= feeder.depth():
+            # Lines held here count as queued for the policy, so all of
+            # them are handed over before pausing
+            queue_dispatched_lines(lines_by_feeder)
+            feeder.wait_for_space()
+    queue_dispatched_lines(lines_by_feeder)
+    return lines_read, lines_skipped
+
+
+class OutputChannel:
+    """
+    Output FIFO served by the selectors engine. Provides the interface
+    of WorkerFeeder used by the dispatch policies and dispatch_lines,
+    but lines are appended to a write buffer that the event loop writes
+    to the FIFO when it is writable.
+
+    The enqueue times of the buffered lines are kept as [enqueue time,
+    number of lines] segments, in the order of the buffer.
+    """
+
+    def __init__(self, path, steal=False):
+        self.path = path
+        self.steal = steal
+        self.fd = None
+        self.buffer = bytearray()
+        self.closed = False
+        self.lines_queued = 0
+        self.lines_written = 0
+        self.lines_stolen = 0
+        self.lines_lost = 0
+        self.writes = 0
+        self.latency = LatencyHistogram()
+        self.enqueue_times = collections.deque()
+        self.open_start = time.monotonic()
+        self.open_end = None
+        self.depth_decreases = None
+
+    def add_lines_queued(self, n):
+        self.lines_queued += n
+        if n < 0 and self.depth_decreases is not None:
+            self.depth_decreases.append(self)
+
+    def depth(self):
+        return self.lines_queued - self.lines_written
+
+    def open_wait(self):
+        end = self.open_end if self.open_end is not None else time.monotonic()
+        return end - self.open_start
+
+    def queue_lines(self, lines, counted=False):
+        if not counted:
+            self.add_lines_queued(len(lines))
+        if self.closed:
+            self.lines_lost += len(lines)
+            return
+        self.buffer += ("\n".join(lines) + "\n").encode()
+        self.enqueue_times.append([time.monotonic(), len(lines)])
+
+    def add_lines_written(self, n):
+        """Count n lines as written, recording their latencies."""
+        self.lines_written += n
+        if self.depth_decreases is not None:
+            self.depth_decreases.append(self)
+        now = time.monotonic()
+        while n > 0:
+            segment = self.enqueue_times[0]
+            k = min(n, segment[1])
+            self.latency.add(now - segment[0], k)
+            segment[1] -= k
+            n -= k
+            if segment[1] == 0:
+                self.enqueue_times.popleft()
+
+    def try_open(self):
+        """Try to open the FIFO without blocking. Return True if it was
+        opened, False if it has no reader yet."""
+        try:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                return False
+            raise
+        self.open_end = time.monotonic()
+        log.info("Connected to %s after %.3fs", self.path, self.open_wait())
+        return True
+
+    def write_available(self):
+        """Write buffered lines until the FIFO is full, in chunks of whole
+        lines of at most PIPE_BUF bytes (lines longer than that are
+        written on their own)."""
+        while self.buffer:
+            end = self.buffer.rfind(b"\n", 0, PIPE_BUF)
+            if end < 0:
+                end = self.buffer.find(b"\n")
+            try:
+                written = os.write(self.fd, memoryview(self.buffer)[:end + 1])
+            except BlockingIOError:
+                return
+            except BrokenPipeError:
+                self.lines_lost += self.buffer.count(b"\n")
+                log.error("Reader of %s closed it", self.path)
+                self.buffer = bytearray()
+                self.enqueue_times.clear()
+                self.closed = True
+                return
+            self.add_lines_written(self.buffer.count(b"\n", 0, written))
+            self.writes += 1
+            del self.buffer[:written]
+
+    def steal_from(self, victim):
+        """Move the second half of the lines buffered for victim (whole
+        lines not being written) to this channel."""
+        cut = victim.buffer.find(b"\n", len(victim.buffer) // 2)
+        if cut < 0 or cut + 1 >= len(victim.buffer):
+            return
+        stolen = victim.buffer[cut + 1:]
+        del victim.buffer[cut + 1:]
+        n = stolen.count(b"\n")
+        victim.add_lines_queued(-n)
+        self.lines_queued += n
+        self.lines_stolen += n
+        self.buffer += stolen
+
+        # Move the enqueue times of the stolen lines, taken from the end
+        # of the victim segments
+        segments = collections.deque()
+        while n > 0:
+            segment = victim.enqueue_times[-1]
+            k = min(n, segment[1])
+            segments.appendleft([segment[0], k])
+            segment[1] -= k
+            n -= k
+            if segment[1] == 0:
+                victim.enqueue_times.pop()
+        self.enqueue_times.extend(segments)
+
+    def close(self):
+        if self.fd is None:
+            log.warning("%s was never connected (%d lines not written)", self.path, self.depth())
+            return
+        os.close(self.fd)
+        log.info("Closed %s (%d lines written, %d stolen, %d writes)", self.path, self.lines_written,
+                 self.lines_stolen, self.writes)
+        if self.lines_lost:
+            log.error("%d lines for %s were lost", self.lines_lost, self.path)
+
+
+class StatsReporter(threading.Thread):
+    """
+    Writes a statistics record (see module documentation) to a file or
+    FIFO every interval seconds, and a final one when finish is called.
+
+    The feeders (WorkerFeeder or OutputChannel objects) are only read,
+    and the engine updates lines_read and lines_skipped, so the records
+    may mix values from slightly different moments.
+    """
+
+    def __init__(self, path, interval, feeders):
+        super().__init__(daemon=True, name="stats")
+        self.path = path
+        self.interval = interval
+        self.feeders = feeders
+        self.lines_read = 0
+        self.lines_skipped = 0
+        self.done = threading.Event()
+        self.connected = threading.Event()
+        self.start_time = time.monotonic()
+        self.last_time = self.start_time
+        self.last_lines_in = 0
+        self.last_lines_out = 0
+
+    def get_record(self, final=False):
+        now = time.monotonic()
+        lines_out = sum(feeder.lines_written for feeder in self.feeders)
+        elapsed = now - self.last_time
+        record = {
+            "time": round(time.time(), 3),
+            "elapsed": round(now - self.start_time, 3),
+            "final": final,
+            "lines_in": self.lines_read,
+            "lines_skipped": self.lines_skipped,
+            "lines_out": lines_out,
+            "lines_in_per_s": round((self.lines_read - self.last_lines_in) / elapsed, 1) if elapsed > 0 else 0.0,
+            "lines_out_per_s": round((lines_out - self.last_lines_out) / elapsed, 1) if elapsed > 0 else 0.0,
+            "workers": [
+                {
+                    "path": feeder.path,
+                    "connected": feeder.open_end is not None,
+                    "open_wait": round(feeder.open_wait(), 6),
+                    "depth": feeder.depth(),
+                    "lines_written": feeder.lines_written,
+                    "lines_stolen": feeder.lines_stolen,
+                    "latency": feeder.latency.to_dict(),
+                }
+                for feeder in self.feeders
+            ],
+        }
+        self.last_time = now
+        self.last_lines_in = self.lines_read
+        self.last_lines_out = lines_out
+        return record
+
+    def run(self):
+        # Opening a FIFO blocks until its reader connects
+        with open(self.path, "w") as f:
+            self.connected.set()
+            log.info("Writing statistics to %s", self.path)
+            try:
+                while not self.done.wait(self.interval):
+                    f.write(json.dumps(self.get_record()) + "\n")
+                    f.flush()
+                f.write(json.dumps(self.get_record(final=True)) + "\n")
+                f.flush()
+            except BrokenPipeError:
+                log.error("Reader of %s closed it, no more statistics written", self.path)
+
+    def finish(self):
+        """Write the final record and wait for the reporter to finish. If
+        the statistics FIFO has no reader, give up instead of waiting."""
+        self.done.set()
+        if self.connected.is_set():
+            self.join()
+        else:
+            log.warning("No reader connected to %s, final statistics not written", self.path)
+
+
+def start_stats_reporter(args, feeders):
+    """Start a StatsReporter if --stats-out was given, returning it (or
+    None)."""
+    if args.stats_out is None:
+        return None
+    reporter = StatsReporter(args.stats_out, args.stats_interval, feeders)
+    reporter.start()
+    return reporter
+
+
+def steal_for_idle_channels(channels):
+    """Make each connected channel without buffered lines steal from the
+    channel with the most buffered bytes. Channels are kept in a max-heap
+    keyed on buffer size, so each steal costs O(log w)."""
+    heap = [(-len(ch.buffer), i) for i, ch in enumerate(channels) if ch.buffer]
+    if not heap:
+        return
+    heapq.heapify(heap)
+    for i, ch in enumerate(channels):
+        if ch.fd is None or ch.closed or ch.buffer:
+            continue
+        if not heap:
+            break
+        victim_idx = heapq.heappop(heap)[1]
+        victim = channels[victim_idx]
+        ch.steal_from(victim)
+        if victim.buffer:
+            heapq.heappush(heap, (-len(victim.buffer), victim_idx))
+        if ch.buffer:
+            heapq.heappush(heap, (-len(ch.buffer), i))
+
+
+def run_selectors_engine(args, outf_paths, policy_class):
+    """Serve input and output FIFOs from a single selectors event loop.
+    Return (lines read, lines skipped) pair."""
+    channels = [OutputChannel(path, policy_class.steal) for path in outf_paths]
+    policy = policy_class(channels)
+    stats = start_stats_reporter(args, channels)
+    sel = selectors.DefaultSelector()
+    lines_read = 0
+    lines_skipped = 0
+
+    # Blocking open, see module documentation
+    in_fd = os.open(args.inf, os.O_RDONLY)
+    os.set_blocking(in_fd, False)
+    sel.register(in_fd, selectors.EVENT_READ, None)
+    input_open = True
+    input_paused = False
+    pending_input = b""
+    pause_count = 0
+    pause_time = 0.0
+    pause_start = None
+
+    unconnected = list(channels)
+    try:
+        while True:
+            # Try to connect output FIFOs without reader
+            if unconnected:
+                unconnected = [ch for ch in unconnected if not ch.try_open()]
+
+            # Update events of interest of the output FIFOs
+            for ch in channels:
+                if ch.fd is None or ch.closed:
+                    continue
+                registered = ch.fd in sel.get_map()
+                if ch.buffer and not registered:
+                    sel.register(ch.fd, selectors.EVENT_WRITE, ch)
+                elif not ch.buffer and registered:
+                    sel.unregister(ch.fd)
+
+            # Apply backpressure on the input FIFO
+            if input_open:
+                if args.high_water > 0:
+                    full = any(ch.depth() >= args.high_water for ch in channels if not ch.closed)
+                else:
+                    full = any(len(ch.buffer) > OUTPUT_BUFFER_HIGH_WATER for ch in channels)
+                if full and not input_paused:
+                    sel.unregister(in_fd)
+                    input_paused = True
+                    pause_count += 1
+                    pause_start = time.monotonic()
+                elif not full and input_paused:
+                    sel.register(in_fd, selectors.EVENT_READ, None)
+                    input_paused = False
+                    pause_time += time.monotonic() - pause_start
+
+            # Finish when the input is closed and every line is written
+            # (channels without reader have no lines left either, since
+            # they cannot write them)
+            if not input_open and not any(ch.buffer for ch in channels if not ch.closed):
+                break
+
+            # Wait for events, waking up periodically while there are
+            # output FIFOs without reader
+            timeout = RETRY_OPEN_INTERVAL if unconnected else None
+            for key, mask in sel.select(timeout):
+                if key.data is None:
+                    data = os.read(in_fd, INPUT_CHUNK_SIZE)
+                    if not data:
+                        sel.unregister(in_fd)
+                        os.close(in_fd)
+                        input_open = False
+                        lines = [pending_input.decode()] if pending_input else []
+                    else:
+                        data = pending_input + data
+                        end = data.rfind(b"\n")
+                        pending_input = data[end + 1:]
+                        lines = data[:end].decode().split("\n") if end >= 0 else []
+                    chunk_read, chunk_skipped = dispatch_lines(lines, channels, policy)
+                    lines_read += chunk_read
+                    lines_skipped += chunk_skipped
+                    if stats is not None:
+                        stats.lines_read = lines_read
+                        stats.lines_skipped = lines_skipped
+                    if not input_open:
+                        log.info("Input FIFO closed, no more blocks incoming "
+                                 "(%d lines read, %d skipped)", lines_read, lines_skipped)
+                else:
+                    ch = key.data
+                    ch.write_available()
+                    if ch.closed:
+                        sel.unregister(ch.fd)
+
+            # Idle channels steal lines buffered for the busiest ones
+            if policy_class.steal:
+                steal_for_idle_channels(channels)
+
+        # Wait for the readers that did not connect yet, so every worker
+        # sees end of file when its FIFO is closed, as with the threads
+        # engine
+        if unconnected:
+            log.info("Waiting for the readers of %d output FIFOs", len(unconnected))
+        while unconnected:
+            time.sleep(RETRY_OPEN_INTERVAL)
+            unconnected = [ch for ch in unconnected if not ch.try_open()]
+    finally:
+        for ch in channels:
+            ch.close()
+        sel.close()
+        if stats is not None:
+            stats.finish()
+
+    log.info("Backpressure applied %d times for %.3fs", pause_count, pause_time)
+    return lines_read, lines_skipped
+
+
 def main():
     args, outf_paths = parse_args()
     setup_logging(args.log_level)
     w = args.workers
 
-    log.info("Starting dispatcher: w=%d inf=%s outf=%s", w, args.inf, outf_paths)
+    log.info("Starting dispatcher: w=%d inf=%s outf=%s policy=%s engine=%s", w, args.inf, outf_paths,
+             args.policy, args.engine)
+
+    policy_class = POLICIES[args.policy]
+    if args.engine == "selectors":
+        run_selectors_engine(args, outf_paths, policy_class)
+        log.info("Dispatcher finished")
+        return
 
-    feeders = [WorkerFeeder(path) for path in outf_paths]
+    feeders = [WorkerFeeder(path, args.batch, args.max_latency, policy_class.steal, args.high_water)
+               for path in outf_paths]
+    policy = policy_class(feeders)
     for feeder in feeders:
+        feeder.peers = feeders
         feeder.start()
+    stats = start_stats_reporter(args, feeders)
 
     lines_read = 0
     lines_skipped = 0
 
     try:
-        for line in read_input_lines(args.inf):
-            line = line.strip()
-            if not line:
-                continue
-            lines_read += 1
-            idx = extract_index(line)
-            if idx is None:
-                log.warning("Could not parse index from '%s', skipping", line)
-                lines_skipped += 1
-                continue
-            log.debug("Dispatching %s -> feeder %d (%s)", line, idx % w, os.path.basename(feeders[idx % w].path))
-            feeders[idx % w].queue_line(line)
+        if args.batch:
+            for lines in read_input_chunks(args.inf):
+                chunk_read, chunk_skipped = dispatch_lines(lines, feeders, policy, wait_for_space=True)
+                lines_read += chunk_read
+                lines_skipped += chunk_skipped
+                if stats is not None:
+                    stats.lines_read = lines_read
+                    stats.lines_skipped = lines_skipped
+        else:
+            for line in read_input_lines(args.inf):
+                line = line.strip()
+                if not line:
+                    continue
+                lines_read += 1
+                if stats is not None:
+                    stats.lines_read = lines_read
+                feeder = policy.select(line)
+                if feeder is None:
+                    log.warning("Could not parse index from '%s', skipping", line)
+                    lines_skipped += 1
+                    if stats is not None:
+                        stats.lines_skipped = lines_skipped
+                    continue
+                log.debug("Dispatching %s -> %s", line, os.path.basename(feeder.path))
+                feeder.wait_for_space()
+                feeder.queue_line(line)
 
         log.info("Input FIFO closed, no more blocks incoming "
                   "(%d lines read, %d skipped)", lines_read, lines_skipped)
@@ -190,7 +1119,12 @@ def main():
             feeder.stop()
         for feeder in feeders:
             feeder.join()
+        if stats is not None:
+            stats.finish()
 
+    log.info("Backpressure applied %d times for %.3fs",
+             sum(feeder.backpressure_count for feeder in feeders),
+             sum(feeder.backpressure_time for feeder in feeders))
     log.info("Dispatcher finished")
 
 
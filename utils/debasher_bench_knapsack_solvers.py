@@ -0,0 +1,317 @@
+"""
+debasher_bench_knapsack_solvers.py
+
+Benchmarks the knapsack solvers on random problems generated with
+debasher_gen_knapsack_problem. Problems are generated for every
+combination of the given sizes, weight dimensions, dependency
+probabilities (--dep-prob) and mutual-edge probabilities
+(--together-prob), and each problem is solved with the selected
+solvers:
+
+    greedy      debasher_solve_knapsack_greedy (single pass)
+    restarts    debasher_solve_knapsack_greedy -r <int> (one run per
+                value given with --restarts)
+    ga          debasher_solve_knapsack_ga
+    bb          debasher_solve_knapsack_bb (ignores dependencies, so it
+                is only run on problems without them)
+    exact       debasher_solve_knapsack_greedy -x <int>
+
+For each run, the wall time, the peak memory (maximum resident set
+size of the solver process), the value obtained and its gap to the
+best value known for the problem are recorded. Solutions are checked
+against capacities and dependencies, and the value of infeasible
+solutions is not used as best known value. Results are printed as a
+table and can be written in CSV and JSON formats.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Constants
+SOLVER_NAMES = ("greedy", "restarts", "ga", "bb", "exact")
+RESULT_FIELDS = ["num_processes", "num_weights", "dep_prob", "together_prob", "rep", "seed",
+                 "solver", "status", "wall_time", "peak_mem_kb", "value", "feasible", "gap"]
+GAP_TOLERANCE = 1e-9
+
+##################################################
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=str, default="100,1000",
+                        help="Comma-separated list of numbers of processes (default: 100,1000)")
+    parser.add_argument("--num-weights", type=str, default="2",
+                        help="Comma-separated list of numbers of weight dimensions (default: 2)")
+    parser.add_argument("--dep-probs", type=str, default="0,0.3",
+                        help="Comma-separated list of --dep-prob values (default: 0,0.3)")
+    parser.add_argument("--together-probs", type=str, default="0",
+                        help="Comma-separated list of --together-prob values (default: 0)")
+    parser.add_argument("--reps", type=int, default=1,
+                        help="Number of problems generated per combination (default: 1)")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Seed of the first generated problem, incremented for "
+                             "each problem (default: 1)")
+    parser.add_argument("--solvers", type=str, default="greedy,restarts,ga,bb",
+                        help="Comma-separated list of solvers among %s "
+                             "(default: greedy,restarts,ga,bb)" % ",".join(SOLVER_NAMES))
+    parser.add_argument("--restarts", type=str, default="10,100",
+                        help="Comma-separated list of restarts for the restarts "
+                             "solver (default: 10,100)")
+    parser.add_argument("--exact-max-items", type=int, default=32,
+                        help="-x value for the exact solver (default: 32)")
+    parser.add_argument("--time-limit", type=float, default=1.0,
+                        help="Time limit given to the solvers with -t (default: 1)")
+    parser.add_argument("--timeout", type=float, default=600.0,
+                        help="Seconds after which a solver run is killed (default: 600)")
+    parser.add_argument("--solvers-dir", type=str, default=None,
+                        help="Directory containing the solvers and the problem "
+                             "generator (default: directory of this script)")
+    parser.add_argument("--work-dir", type=str, default=None,
+                        help="Directory where problems are generated, kept after "
+                             "finishing (default: temporary directory)")
+    parser.add_argument("--csv-out", type=str, default=None,
+                        help="Output path for results in CSV format")
+    parser.add_argument("--json-out", type=str, default=None,
+                        help="Output path for results in JSON format")
+    args = parser.parse_args()
+
+    args.sizes = [int(x) for x in args.sizes.split(",")]
+    args.num_weights = [int(x) for x in args.num_weights.split(",")]
+    args.dep_probs = [float(x) for x in args.dep_probs.split(",")]
+    args.together_probs = [float(x) for x in args.together_probs.split(",")]
+    args.restarts = [int(x) for x in args.restarts.split(",")]
+    args.solvers = args.solvers.split(",")
+    for solver in args.solvers:
+        if solver not in SOLVER_NAMES:
+            parser.error("unknown solver '%s'" % solver)
+    if args.solvers_dir is None:
+        args.solvers_dir = os.path.dirname(os.path.abspath(__file__))
+    return args
+
+##################################################
+def get_command(solvers_dir, name):
+    # Installed scripts have no extension, source ones are executed
+    # with the current interpreter
+    path = os.path.join(solvers_dir, name)
+    if os.path.exists(path):
+        return [path]
+    if os.path.exists(path + ".py"):
+        return [sys.executable, path + ".py"]
+    print("Error! %s not found in %s" % (name, solvers_dir), file=sys.stderr)
+    sys.exit(1)
+
+##################################################
+def run_command(cmd, timeout, outfile):
+    # Execute command writing its output to outfile, and return (status,
+    # wall time, peak memory in KB) tuple. The process is waited for
+    # with wait4 so its own resource usage is obtained
+    start = time.time()
+    with open(outfile, "w") as out:
+        proc = subprocess.Popen(cmd, stdout=out, stderr=subprocess.DEVNULL)
+    status = "ok"
+    while True:
+        pid, wait_status, rusage = os.wait4(proc.pid, os.WNOHANG)
+        if pid != 0:
+            break
+        if time.time() - start > timeout:
+            proc.kill()
+            pid, wait_status, rusage = os.wait4(proc.pid, 0)
+            status = "timeout"
+            break
+        time.sleep(0.01)
+    wall_time = time.time() - start
+    proc.returncode = os.waitstatus_to_exitcode(wait_status)
+    if status == "ok" and proc.returncode != 0:
+        status = "failed"
+    return status, wall_time, rusage.ru_maxrss
+
+##################################################
+def generate_problem(args, workdir, num_processes, num_weights, dep_prob, together_prob, seed):
+    # Generate problem, returning (spec file, deps file or None,
+    # capacities) tuple
+    spec = os.path.join(workdir, "spec_%d.txt" % seed)
+    deps = os.path.join(workdir, "deps_%d.txt" % seed)
+    # Remove files of previous runs in the same directory, since no
+    # deps file is written for problems without dependencies
+    for path in (spec, deps):
+        if os.path.exists(path):
+            os.remove(path)
+    cmd = get_command(args.solvers_dir, "debasher_gen_knapsack_problem") + [
+        "-n", str(num_processes), "-w", str(num_weights), "--dep-prob", str(dep_prob),
+        "--together-prob", str(together_prob), "--seed", str(seed),
+        "--spec-out", spec, "--deps-out", deps]
+    output = subprocess.run(cmd, stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+    capacities = re.search(r" -c (\S+)", output).group(1)
+    if not os.path.exists(deps) or os.path.getsize(deps) == 0:
+        deps = None
+    return spec, deps, capacities
+
+##################################################
+def get_solver_runs(args):
+    # Return list of (solver label, solver, extra options) tuples
+    runs = []
+    for solver in args.solvers:
+        if solver == "greedy":
+            runs.append(("greedy", "debasher_solve_knapsack_greedy", []))
+        elif solver == "restarts":
+            for restarts in args.restarts:
+                runs.append(("restarts-%d" % restarts, "debasher_solve_knapsack_greedy",
+                             ["-r", str(restarts), "-g", str(args.seed), "-t", str(args.time_limit)]))
+        elif solver == "ga":
+            runs.append(("ga", "debasher_solve_knapsack_ga", ["-t", str(args.time_limit)]))
+        elif solver == "bb":
+            runs.append(("bb", "debasher_solve_knapsack_bb", ["-t", str(args.time_limit)]))
+        elif solver == "exact":
+            runs.append(("exact", "debasher_solve_knapsack_greedy",
+                         ["-x", str(args.exact_max_items), "-t", str(args.time_limit)]))
+    return runs
+
+##################################################
+def read_problem(spec, deps):
+    # Return (weights by process name, list of (successor, predecessor)
+    # edges) pair
+    weights = {}
+    with open(spec) as f:
+        for entry in f:
+            fields = entry.split()
+            if fields:
+                weights[fields[0]] = [float(x) for x in fields[2:]]
+    edges = []
+    if deps is not None:
+        with open(deps) as f:
+            for entry in f:
+                fields = entry.split()
+                if fields:
+                    edges.append((fields[0], fields[1]))
+    return weights, edges
+
+##################################################
+def read_solution(solfile):
+    # Return (value, packed processes) pair, or (None, None) if the
+    # solution could not be read
+    value = None
+    packed = None
+    with open(solfile) as f:
+        for entry in f:
+            if entry.startswith("Value:"):
+                value = float(entry.split()[1])
+            elif entry.startswith("Packed items:"):
+                packed = entry[len("Packed items:"):].split()
+    return value, packed
+
+##################################################
+def is_feasible(weights, edges, capacities, packed):
+    packed_set = set(packed)
+    for successor, predecessor in edges:
+        if successor in packed_set and predecessor in weights and predecessor not in packed_set:
+            return False
+    for r, capacity in enumerate(capacities):
+        if sum(weights[name][r] for name in packed_set) > capacity + GAP_TOLERANCE:
+            return False
+    return True
+
+##################################################
+def solve_problem(args, workdir, runs, spec, deps, capacities):
+    # Run solvers on problem, returning list of partial records
+    weights, edges = read_problem(spec, deps)
+    cap_list = [float(x) for x in capacities.split(",")]
+    records = []
+    for label, solver, opts in runs:
+        record = {"solver": label, "status": "skipped", "wall_time": None, "peak_mem_kb": None,
+                  "value": None, "feasible": None, "gap": None}
+        if solver == "debasher_solve_knapsack_bb" and deps is not None:
+            # Branch and bound solver does not support dependencies
+            records.append(record)
+            continue
+        cmd = get_command(args.solvers_dir, solver) + ["-s", spec, "-c", capacities] + opts
+        if deps is not None:
+            cmd += ["-d", deps]
+        solfile = os.path.join(workdir, "sol.txt")
+        status, wall_time, peak_mem = run_command(cmd, args.timeout, solfile)
+        record["status"] = status
+        record["wall_time"] = round(wall_time, 4)
+        record["peak_mem_kb"] = peak_mem
+        if status == "ok":
+            value, packed = read_solution(solfile)
+            if value is None or packed is None:
+                record["status"] = "failed"
+            else:
+                record["value"] = value
+                record["feasible"] = is_feasible(weights, edges, cap_list, packed)
+        records.append(record)
+
+    # Compute gaps with respect to best feasible value
+    feasible_values = [r["value"] for r in records if r["feasible"]]
+    if feasible_values:
+        best = max(feasible_values)
+        for r in records:
+            if r["feasible"]:
+                r["gap"] = round((best - r["value"]) / best, 6) if abs(best) > GAP_TOLERANCE else 0.0
+    return records
+
+##################################################
+def print_table(records):
+    print("\t".join(RESULT_FIELDS))
+    for r in records:
+        print("\t".join("-" if r[f] is None else str(r[f]) for f in RESULT_FIELDS))
+
+##################################################
+def write_csv_file(path, records):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for r in records:
+            writer.writerow(r)
+
+##################################################
+def write_json_file(path, records):
+    with open(path, "w") as f:
+        json.dump(records, f, indent=2)
+        f.write("\n")
+
+##################################################
+def main():
+    args = parse_args()
+
+    if args.work_dir is None:
+        workdir = tempfile.mkdtemp(prefix="debasher_bench_knapsack_")
+    else:
+        workdir = args.work_dir
+        os.makedirs(workdir, exist_ok=True)
+
+    runs = get_solver_runs(args)
+    records = []
+    seed = args.seed
+    try:
+        for num_processes in args.sizes:
+            for num_weights in args.num_weights:
+                for dep_prob in args.dep_probs:
+                    for together_prob in args.together_probs:
+                        for rep in range(args.reps):
+                            spec, deps, capacities = generate_problem(args, workdir, num_processes, num_weights,
+                                                                      dep_prob, together_prob, seed)
+                            for record in solve_problem(args, workdir, runs, spec, deps, capacities):
+                                record.update({"num_processes": num_processes, "num_weights": num_weights,
+                                               "dep_prob": dep_prob, "together_prob": together_prob,
+                                               "rep": rep, "seed": seed})
+                                records.append(record)
+                            seed += 1
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(records)
+    if args.csv_out is not None:
+        write_csv_file(args.csv_out, records)
+    if args.json_out is not None:
+        write_json_file(args.json_out, records)
+
+
+if __name__ == "__main__":
+    main()
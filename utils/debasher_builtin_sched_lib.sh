@@ -30,11 +30,18 @@ DEBASHER_BUILTIN_SCHED_KNAPSACK_ITEM_VALUE_WEIGHT_SPEC_FNAME=.knapsack_item_valu
 DEBASHER_BUILTIN_SCHED_KNAPSACK_PRED_SPEC_FNAME=.knapsack_pred_spec.txt
 DEBASHER_BUILTIN_SCHED_KNAPSACK_SOL_FNAME=.knapsack_sol.txt
 DEBASHER_BUILTIN_SCHED_KNAPSACK_SOL_STDERR_FNAME=.knapsack_sol_stderr.txt
+DEBASHER_BUILTIN_SCHED_KNAPSACK_PREV_ITEM_VALUE_WEIGHT_SPEC_FNAME=.knapsack_prev_item_value_weight_spec.txt
+DEBASHER_BUILTIN_SCHED_KNAPSACK_PREV_PRED_SPEC_FNAME=.knapsack_prev_pred_spec.txt
+DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_FIFOS_PREF=.knapsack_solver
 DEBASHER_BUILTIN_SCHED_UNLIMITED_CPUS=-1
 DEBASHER_BUILTIN_SCHED_UNLIMITED_MEM=-1
 DEBASHER_BUILTIN_SCHED_SOLVE_TIME_LIMIT=1
 DEBASHER_BUILTIN_SCHED_PROCESS_VALUE_FOR_KNAPSACK_SOLVER=1
 DEBASHER_BUILTIN_SCHED_GREEDY_SOLVE_RESTARTS=0
+DEBASHER_BUILTIN_SCHED_EXACT_SOLVE_MAX_ITEMS=32
+DEBASHER_BUILTIN_SCHED_USE_KNAPSACK_SOLVER_SERVER=0
+DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_TIMEOUT=60
+DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_POLL_INTERVAL=0.01
 
 # ARRAY TASK STATUSES
 DEBASHER_BUILTIN_SCHED_FINISHED_TASK_STATUS="FINISHED"
@@ -65,6 +72,8 @@ declare DEBASHER_BUILTIN_SCHED_CPUS
 declare DEBASHER_BUILTIN_SCHED_MEM
 declare DEBASHER_BUILTIN_SCHED_ALLOC_CPUS=0
 declare DEBASHER_BUILTIN_SCHED_ALLOC_MEM=0
+declare DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PID
+declare DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PREV_EXIT_TRAP
 
 ###############################
 # BUILTIN SCHEDULER FUNCTIONS #
@@ -893,7 +902,158 @@ debasher_builtin_sched::_generate_knapsack_sol()
     local available_mem=`debasher_builtin_sched::_get_available_mem`
     "${debasher_libexecdir}"/debasher_solve_knapsack_greedy -s "${knapsack_item_value_weight_spec}" -d "${knapsack_pred_spec}" \
                             -c ${available_cpus},${available_mem} -r ${DEBASHER_BUILTIN_SCHED_GREEDY_SOLVE_RESTARTS} \
-                            -t ${DEBASHER_BUILTIN_SCHED_SOLVE_TIME_LIMIT}
+                            -x ${DEBASHER_BUILTIN_SCHED_EXACT_SOLVE_MAX_ITEMS} -t ${DEBASHER_BUILTIN_SCHED_SOLVE_TIME_LIMIT}
+}
+
+########
+debasher_builtin_sched::_knapsack_solver_server_running()
+{
+    if [ -n "${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PID}" ] && kill -0 "${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PID}" 2> /dev/null; then
+        return 0
+    else
+        return 1
+    fi
+}
+
+########
+debasher_builtin_sched::_start_knapsack_solver_server()
+{
+    local dirname=$1
+
+    # Create FIFOs used to communicate with the server
+    local fifos_pref="${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_FIFOS_PREF}"
+    "${RM}" -f "${fifos_pref}.req" "${fifos_pref}.sol"
+    "${MKFIFO}" "${fifos_pref}.req" "${fifos_pref}.sol" || return 1
+
+    # Initialize specifications already sent to the server
+    : > "${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_PREV_ITEM_VALUE_WEIGHT_SPEC_FNAME}"
+    : > "${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_PREV_PRED_SPEC_FNAME}"
+
+    # Launch server
+    local knapsack_sol_stderr="${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_SOL_STDERR_FNAME}"
+    "${debasher_libexecdir}"/debasher_solve_knapsack_greedy -f "${fifos_pref}" \
+                            -r ${DEBASHER_BUILTIN_SCHED_GREEDY_SOLVE_RESTARTS} \
+                            -x ${DEBASHER_BUILTIN_SCHED_EXACT_SOLVE_MAX_ITEMS} \
+                            -t ${DEBASHER_BUILTIN_SCHED_SOLVE_TIME_LIMIT} 2> "${knapsack_sol_stderr}" &
+    DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PID=$!
+
+    # Kill server if the scheduler exits without stopping it (the
+    # previous exit trap, if any, is still executed)
+    DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PREV_EXIT_TRAP=`trap -p EXIT`
+    local prev_exit_trap_cmd=""
+    if [ -n "${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PREV_EXIT_TRAP}" ]; then
+        eval "local -a prev_exit_trap_elems=(${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PREV_EXIT_TRAP})"
+        prev_exit_trap_cmd="; ${prev_exit_trap_elems[2]}"
+    fi
+    trap "debasher_builtin_sched::_kill_knapsack_solver_server '${dirname}'${prev_exit_trap_cmd}" EXIT
+}
+
+########
+debasher_builtin_sched::_wait_for_knapsack_solver_server()
+{
+    # Wait for the given processes, which communicate with the server
+    # through FIFOs, to finish. If the server dies or the timeout
+    # expires, the processes (possibly blocked when opening the FIFOs)
+    # are killed and 1 is returned
+    local start=${SECONDS}
+    while kill -0 "$@" 2> /dev/null; do
+        if ! debasher_builtin_sched::_knapsack_solver_server_running || \
+           [ $((SECONDS - start)) -ge ${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_TIMEOUT} ]; then
+            kill "$@" 2> /dev/null
+            wait "$@" 2> /dev/null
+            return 1
+        fi
+        "${SLEEP}" ${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_POLL_INTERVAL}
+    done
+    wait "$@"
+}
+
+########
+debasher_builtin_sched::_kill_knapsack_solver_server()
+{
+    local dirname=$1
+    local fifos_pref="${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_FIFOS_PREF}"
+
+    if [ -n "${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PID}" ]; then
+        kill "${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PID}" 2> /dev/null
+    fi
+    DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PID=""
+    "${RM}" -f "${fifos_pref}.req" "${fifos_pref}.sol"
+}
+
+########
+debasher_builtin_sched::_stop_knapsack_solver_server()
+{
+    local dirname=$1
+    local fifos_pref="${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_FIFOS_PREF}"
+
+    # Request server to finish, killing it if it does not respond
+    if debasher_builtin_sched::_knapsack_solver_server_running; then
+        echo "EXIT" > "${fifos_pref}.req" &
+        if debasher_builtin_sched::_wait_for_knapsack_solver_server $!; then
+            wait "${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PID}"
+        else
+            kill "${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PID}" 2> /dev/null
+        fi
+    fi
+    debasher_builtin_sched::_kill_knapsack_solver_server "${dirname}"
+
+    # Restore previous exit trap
+    if [ -n "${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PREV_EXIT_TRAP}" ]; then
+        eval "${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PREV_EXIT_TRAP}"
+    else
+        trap - EXIT
+    fi
+    DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_PREV_EXIT_TRAP=""
+}
+
+########
+debasher_builtin_sched::_print_knapsack_server_requests()
+{
+    local prev_knapsack_item_value_weight_spec=$1
+    local knapsack_item_value_weight_spec=$2
+    local prev_knapsack_pred_spec=$3
+    local knapsack_pred_spec=$4
+    local available_cpus=`debasher_builtin_sched::_get_available_cpus`
+    local available_mem=`debasher_builtin_sched::_get_available_mem`
+
+    # Send only the changes with respect to the specifications sent
+    # in the previous iteration
+    "${AWK}" 'FILENAME==ARGV[1] {prev[$1]=$0; next} {curr[$1]=1; if(prev[$1]!=$0) print "ITEM",$0} END {for(item in prev) if(!(item in curr)) print "DEL",item}' \
+             "${prev_knapsack_item_value_weight_spec}" "${knapsack_item_value_weight_spec}"
+    "${AWK}" 'FILENAME==ARGV[1] {prev[$0]=1; next} {curr[$0]=1; if(!($0 in prev)) print "DEP",$0} END {for(dep in prev) if(!(dep in curr)) print "UNDEP",dep}' \
+             "${prev_knapsack_pred_spec}" "${knapsack_pred_spec}"
+    echo "CAP ${available_cpus},${available_mem}"
+    echo "SOLVE"
+}
+
+########
+debasher_builtin_sched::_generate_knapsack_sol_with_server()
+{
+    local dirname=$1
+    local knapsack_item_value_weight_spec=$2
+    local knapsack_pred_spec=$3
+    local fifos_pref="${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_SERVER_FIFOS_PREF}"
+    local prev_knapsack_item_value_weight_spec="${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_PREV_ITEM_VALUE_WEIGHT_SPEC_FNAME}"
+    local prev_knapsack_pred_spec="${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_PREV_PRED_SPEC_FNAME}"
+
+    # Send requests and read solution. Both operations are executed
+    # in background, so the scheduler does not block if the server
+    # stops responding (the server is then stopped)
+    debasher_builtin_sched::_print_knapsack_server_requests "${prev_knapsack_item_value_weight_spec}" "${knapsack_item_value_weight_spec}" \
+                                                            "${prev_knapsack_pred_spec}" "${knapsack_pred_spec}" > "${fifos_pref}.req" &
+    local req_pid=$!
+    "${CAT}" "${fifos_pref}.sol" &
+    local sol_pid=$!
+    if ! debasher_builtin_sched::_wait_for_knapsack_solver_server ${req_pid} ${sol_pid}; then
+        echo "Warning: knapsack solver server is not responding, stopping it" >&2
+        debasher_builtin_sched::_stop_knapsack_solver_server "${dirname}"
+        return 1
+    fi
+
+    # Keep specifications known by the server
+    "${CP}" "${knapsack_item_value_weight_spec}" "${prev_knapsack_item_value_weight_spec}"
+    "${CP}" "${knapsack_pred_spec}" "${prev_knapsack_pred_spec}"
 }
 
 ########
@@ -922,7 +1082,10 @@ debasher_builtin_sched::_solve_knapsack()
         # Solve knapsack problem using the algorithm
         local knapsack_sol="${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_SOL_FNAME}"
         local knapsack_sol_stderr="${dirname}/${DEBASHER_BUILTIN_SCHED_KNAPSACK_SOL_STDERR_FNAME}"
-        debasher_builtin_sched::_generate_knapsack_sol "${knapsack_item_value_weight_spec}" "${knapsack_pred_spec}" > "${knapsack_sol}" 2> "${knapsack_sol_stderr}"
+        if ! debasher_builtin_sched::_knapsack_solver_server_running || \
+           ! debasher_builtin_sched::_generate_knapsack_sol_with_server "${dirname}" "${knapsack_item_value_weight_spec}" "${knapsack_pred_spec}" > "${knapsack_sol}"; then
+            debasher_builtin_sched::_generate_knapsack_sol "${knapsack_item_value_weight_spec}" "${knapsack_pred_spec}" > "${knapsack_sol}" 2> "${knapsack_sol_stderr}"
+        fi
         DEBASHER_BUILTIN_SCHED_SELECTED_PROCESSES=`"${AWK}" -F ": " '{if($1=="Packed items") print $2}' "${knapsack_sol}"`
     fi
 }
@@ -1017,6 +1180,7 @@ debasher_builtin_sched::_select_processes_to_be_exec()
         # Check if no processes could be selected
         if [ -z "${DEBASHER_BUILTIN_SCHED_SELECTED_PROCESSES}" ]; then
             echo "Error: no suitable processes could be selected for execution. If the program uses FIFOs, consider increasing the available resources (cpus, memory) or removing resource restrictions at all. Aborting..." >&2
+            debasher_builtin_sched::_stop_knapsack_solver_server "${dirname}"
             exit 1
         fi
 
@@ -1505,6 +1669,14 @@ debasher_builtin_sched::execute_program_processes()
 
     echo "* Executing program processes..." >&2
 
+    # Start knapsack solver server if requested (the solver is only
+    # used when computational resources are limited)
+    if [ ${DEBASHER_BUILTIN_SCHED_USE_KNAPSACK_SOLVER_SERVER} -eq 1 ] && \
+       [ ${DEBASHER_BUILTIN_SCHED_CPUS} -ne ${DEBASHER_BUILTIN_SCHED_UNLIMITED_CPUS} -o \
+         ${DEBASHER_BUILTIN_SCHED_MEM} -ne ${DEBASHER_BUILTIN_SCHED_UNLIMITED_MEM} ]; then
+        debasher_builtin_sched::_start_knapsack_solver_server "${dirname}" || return 1
+    fi
+
     # Execute scheduling loop
     local end=0
     while [ ${end} -eq 0 ]; do
@@ -1534,6 +1706,9 @@ debasher_builtin_sched::execute_program_processes()
         iterno=$((iterno + 1))
     done
 
+    # Stop knapsack solver server
+    debasher_builtin_sched::_stop_knapsack_solver_server "${dirname}"
+
     echo "" >&2
 }
 
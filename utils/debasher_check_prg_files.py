@@ -37,10 +37,18 @@ def take_pars():
     flags["g_given"]=False
     flags["d_given"]=False
     flags["a_given"]=False
+    flags["t_given"]=False
+    flags["c_given"]=False
+    flags["z_given"]=False
+    flags["e_given"]=False
+    values["expand"]=""
+    flags["o_given"]=False
+    values["outfile"]=None
+    flags["j_given"]=False
     values["verbose"]=False
 
     try:
-        opts, args = getopt.getopt(sys.argv[1:],"p:rgdav",["prefix=","print-reord","dep-graph","print-deps","proc-graph", "verbose"])
+        opts, args = getopt.getopt(sys.argv[1:],"p:rgdatcze:o:j:v",["prefix=","print-reord","dep-graph","print-deps","proc-graph", "critical-path", "use-cache", "compress-arrays", "expand=", "outfile=", "export=", "verbose"])
     except getopt.GetoptError:
         print_help()
         sys.exit(2)
@@ -60,6 +68,21 @@ def take_pars():
                 flags["d_given"]=True
             elif opt in ("-a", "--proc-graph"):
                 flags["a_given"]=True
+            elif opt in ("-t", "--critical-path"):
+                flags["t_given"]=True
+            elif opt in ("-c", "--use-cache"):
+                flags["c_given"]=True
+            elif opt in ("-z", "--compress-arrays"):
+                flags["z_given"]=True
+            elif opt in ("-e", "--expand"):
+                values["expand"] = arg
+                flags["e_given"]=True
+            elif opt in ("-o", "--outfile"):
+                values["outfile"] = arg
+                flags["o_given"]=True
+            elif opt in ("-j", "--export"):
+                values["export"] = arg
+                flags["j_given"]=True
             elif opt in ("-v", "--verbose"):
                 flags["verbose"]=True
     return (flags,values)
@@ -90,15 +113,55 @@ def check_pars(flags,values):
         print("Error! -a and -d options cannot be given simultaneously", file=sys.stderr)
         sys.exit(2)
 
+    if(flags["t_given"] and (flags["r_given"] or flags["g_given"] or flags["d_given"] or flags["a_given"])):
+        print("Error! -t option cannot be given with -r, -g, -d or -a options", file=sys.stderr)
+        sys.exit(2)
+
+    if(flags["z_given"] and not flags["a_given"]):
+        print("Error! -z option requires -a option", file=sys.stderr)
+        sys.exit(2)
+
+    if(flags["e_given"] and not flags["z_given"]):
+        print("Error! -e option requires -z option", file=sys.stderr)
+        sys.exit(2)
+
+    if(flags["o_given"] and not (flags["g_given"] or flags["a_given"])):
+        print("Error! -o option requires -g or -a option", file=sys.stderr)
+        sys.exit(2)
+
+    if(flags["j_given"]):
+        if(not (flags["g_given"] or flags["a_given"])):
+            print("Error! -j option requires -g or -a option", file=sys.stderr)
+            sys.exit(2)
+        if(flags["z_given"]):
+            print("Error! -j and -z options cannot be given simultaneously", file=sys.stderr)
+            sys.exit(2)
+        if(values["export"] not in (EXPORT_FORMAT_JSON, EXPORT_FORMAT_NDJSON)):
+            print("Error! -j option value should be", EXPORT_FORMAT_JSON, "or", EXPORT_FORMAT_NDJSON, file=sys.stderr)
+            sys.exit(2)
+
 ##################################################
 def print_help():
-    print("debasher_check -p <string> [-r|-g|-d|-a] [-v]", file=sys.stderr)
+    print("debasher_check -p <string> [-r|-g|-d|-t|-a [-z [-e <string>]]] [-j <string>] [-o <string>] [-c] [-v]", file=sys.stderr)
     print("", file=sys.stderr)
     print("-p <string>    Prefix of program files", file=sys.stderr)
     print("-r             Print reordered process specification", file=sys.stderr)
     print("-g             Print dependency graph in graphviz format", file=sys.stderr)
     print("-d             Print dependencies for each process", file=sys.stderr)
+    print("-t             Print earliest and latest start times (in seconds) and", file=sys.stderr)
+    print("               slack for each process, as well as the critical path,", file=sys.stderr)
+    print("               using the time attribute of process specification", file=sys.stderr)
     print("-a             Print process graph", file=sys.stderr)
+    print("-z             Collapse ranges of array tasks whose options only differ", file=sys.stderr)
+    print("               in the task index when printing the process graph", file=sys.stderr)
+    print("-e <string>    Comma-separated list of processes whose array tasks", file=sys.stderr)
+    print("               are not collapsed (only used with -z)", file=sys.stderr)
+    print("-j <string>    Export graph given with -g or -a in machine-readable", file=sys.stderr)
+    print("               format instead of graphviz (json or ndjson)", file=sys.stderr)
+    print("-o <string>    Write graph to file instead of standard output (only", file=sys.stderr)
+    print("               used with -g or -a)", file=sys.stderr)
+    print("-c             Use cache of parsed program files (stored in", file=sys.stderr)
+    print("               <prefix>.*.prgcache files)", file=sys.stderr)
     print("-v             Verbose mode", file=sys.stderr)
 
 ##################################################
@@ -106,10 +169,18 @@ def print_entries(process_entries):
     for e in process_entries:
         print(e)
 
+##################################################
+def get_expanded_processes(expand):
+    expanded_processes = set()
+    for processname in expand.split(","):
+        if processname:
+            expanded_processes.add(processname)
+    return expanded_processes
+
 ##################################################
 def process_pars(flags,values):
     # Create DependencyGraph instance
-    dep_graph = DependencyGraph(values["prefix"])
+    dep_graph = DependencyGraph(values["prefix"], flags["c_given"])
 
     # Show checking results
     if(not dep_graph.syntax_ok()):
@@ -126,12 +197,25 @@ def process_pars(flags,values):
         if(flags["r_given"]):
             print_entries(ordered_process_entries)
         elif(flags["g_given"]):
-            dep_graph.print()
+            if(flags["j_given"]):
+                dep_graph.export(values["export"], values["outfile"])
+            else:
+                dep_graph.print(values["outfile"])
         elif(flags["d_given"]):
             dep_graph.print_deps(ordered_process_entries)
+        elif(flags["t_given"]):
+            if(not dep_graph.print_critical_path_info()):
+                return 1
         elif(flags["a_given"]):
-            proc_graph = ProcessGraph(values["prefix"])
-            proc_graph.print()
+            proc_graph = ProcessGraph(values["prefix"], flags["c_given"])
+            if(flags["j_given"]):
+                proc_graph.export(values["export"], values["outfile"])
+            elif(flags["z_given"]):
+                proc_graph.print_compressed(get_expanded_processes(values["expand"]), values["outfile"])
+            else:
+                proc_graph.print(values["outfile"])
+            proc_graph.save_to_cache()
+        dep_graph.save_to_cache()
     else:
         print("Process specification is not correct", file=sys.stderr)
         return 1
@@ -61,6 +61,7 @@ usage()
     echo "                          [--dflt-nodes <string>] [--dflt-throttle <string>]"
     echo "                          [--rerun-outdated-procs] [--conda-support]"
     echo "                          [--docker-support] [--gen-proc-graph]"
+    echo "                          [--cache-prg-files]"
     echo "                          [--show-cmdline-opts|--check-proc-opts|--debug]"
     echo "                          [--wait] [--builtinsched-debug] [--version] [--help]"
     echo ""
@@ -80,6 +81,8 @@ usage()
     echo "--conda-support           Enable conda support"
     echo "--docker-support          Enable docker support"
     echo "--gen-proc-graph          Generate process graph"
+    echo "--cache-prg-files         Cache information extracted from program files when"
+    echo "                          generating graphs (stored in <prefix>.*.prgcache)"
     echo "--show-cmdline-opts       Show command line options for the program"
     echo "--check-proc-opts         Check process options"
     echo "--debug                   Do everything except launching program processes"
@@ -107,6 +110,7 @@ read_pars()
     conda_support_given=0
     docker_support_given=0
     gen_proc_graph_given=0
+    cache_prg_files_given=0
     show_cmdline_opts_given=0
     check_proc_opts_given=0
     debug=0
@@ -191,6 +195,11 @@ read_pars()
                       gen_proc_graph_given=1
                   fi
                   ;;
+            "--cache-prg-files")
+                  if [ $# -ne 0 ]; then
+                      cache_prg_files_given=1
+                  fi
+                  ;;
             "--show-cmdline-opts") show_cmdline_opts_given=1
                           ;;
             "--check-proc-opts") check_proc_opts_given=1
@@ -358,7 +367,12 @@ gen_process_graph()
 
     echo "# Generating process graph..." >&2
 
-    "${debasher_libexecdir}"/debasher_check_prg_files -p "${prefix_of_prg_files}" -a > "${procgraph_file_prefix}.${DEBASHER_GRAPHS_FEXT}" || return 1
+    local cache_opt=""
+    if [ "${cache_prg_files_given}" -eq 1 ]; then
+        cache_opt="-c"
+    fi
+
+    "${debasher_libexecdir}"/debasher_check_prg_files -p "${prefix_of_prg_files}" -a ${cache_opt} > "${procgraph_file_prefix}.${DEBASHER_GRAPHS_FEXT}" || return 1
 
     if [ -z "${DOT}" ]; then
         echo "Warning: Graphviz is not installed, so the process graph in pdf format won't be generated" >&2
@@ -381,7 +395,12 @@ gen_dependency_graph()
 
     echo "# Generating dependency graph..." >&2
 
-    "${debasher_libexecdir}"/debasher_check_prg_files -p "${prefix_of_prg_files}" -g > "${depgraph_file_prefix}.${DEBASHER_GRAPHS_FEXT}" || return 1
+    local cache_opt=""
+    if [ "${cache_prg_files_given}" -eq 1 ]; then
+        cache_opt="-c"
+    fi
+
+    "${debasher_libexecdir}"/debasher_check_prg_files -p "${prefix_of_prg_files}" -g ${cache_opt} > "${depgraph_file_prefix}.${DEBASHER_GRAPHS_FEXT}" || return 1
 
     if [ -z "${DOT}" ]; then
         echo "Warning: Graphviz is not installed, so the process graph in pdf format won't be generated" >&2
@@ -6,9 +6,21 @@ a spec file (process_id value weight1 ... weightN), an optional deps
 file (successor_id predecessor_id), and a suggested list of
 capacities printed to stdout so you can copy-paste a ready-to-run
 command.
+
+With --stream, spec and deps lines are written to disk as processes
+are generated, so large problems (e.g. 1M processes) can be created
+without keeping them in memory. In this mode, each process depends on
+a random number of earlier processes with mean --avg-in-degree (drawn
+from the last --dep-window processes if given), which takes time
+proportional to the number of edges, and array processes can be
+generated with --array-prob: their tasks are named <process>_<task>
+and share the same value and weights, as the items that the builtin
+scheduler creates for array tasks.
 """
 
 import argparse
+import array
+import os
 import random
 
 ##################################################
@@ -32,6 +44,24 @@ def parse_args():
                          help="Probability of adding a 'must go together' "
                               "pair (mutual edge) between two random "
                               "processes (default: 0.0, disabled)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write spec and deps files while generating "
+                             "processes, without keeping them in memory")
+    parser.add_argument("--avg-in-degree", type=float, default=None,
+                        help="Average number of predecessors of each "
+                             "process (default: --dep-prob, only used with "
+                             "--stream)")
+    parser.add_argument("--dep-window", type=int, default=0,
+                        help="Predecessors are chosen among the given "
+                             "number of previous processes (default: 0, "
+                             "all of them, only used with --stream)")
+    parser.add_argument("--array-prob", type=float, default=0.0,
+                        help="Probability that a process is an array "
+                             "process (default: 0.0, only used with "
+                             "--stream)")
+    parser.add_argument("--array-size", type=str, default=None,
+                        help="min,max number of tasks of array processes "
+                             "(default: 2,100, only used with --stream)")
     parser.add_argument("--floats", action="store_true",
                          help="Generate float values/weights/capacities "
                               "instead of integers")
@@ -41,7 +71,13 @@ def parse_args():
                          help="Output path for the spec file (default: spec.txt)")
     parser.add_argument("--deps-out", type=str, default="deps.txt",
                          help="Output path for the deps file (default: deps.txt)")
-    return parser.parse_args()
+    args = parser.parse_args()
+    if not args.stream and (args.avg_in_degree is not None or args.dep_window or args.array_prob
+                            or args.array_size is not None):
+        parser.error("--avg-in-degree, --dep-window, --array-prob and --array-size require --stream")
+    if args.array_size is None:
+        args.array_size = "2,100"
+    return args
 
 ##################################################
 def random_number(rng, low, high, as_float):
@@ -112,32 +148,131 @@ def compute_capacities(weights, ratio, as_float):
         capacities.append(fmt % cap if as_float else fmt % int(round(cap)))
     return capacities
 
+##################################################
+def get_item_names(i, array_sizes):
+    # Return names of the items of process i (its tasks if it is an
+    # array process)
+    if array_sizes[i] == 0:
+        return ["p%d" % i]
+    return ["p%d_%d" % (i, t) for t in range(1, array_sizes[i] + 1)]
+
+##################################################
+def get_random_item_name(rng, i, array_sizes):
+    # Return name of the process i, or of a random task of it if it is
+    # an array process
+    if array_sizes[i] == 0:
+        return "p%d" % i
+    return "p%d_%d" % (i, rng.randint(1, array_sizes[i]))
+
+##################################################
+def sample_predecessors(args, rng, i, avg_in_degree):
+    # Sample distinct earlier processes, the number of them has mean
+    # avg_in_degree. Only O(number of predecessors) work is done
+    first = max(0, i - args.dep_window) if args.dep_window > 0 else 0
+    num_candidates = i - first
+    if num_candidates <= 0:
+        return []
+    k = int(avg_in_degree)
+    if rng.random() < avg_in_degree - k:
+        k += 1
+    k = min(k, num_candidates)
+    predecessors = set()
+    while len(predecessors) < k:
+        predecessors.add(rng.randint(first, i - 1))
+    return sorted(predecessors)
+
+##################################################
+def stream_problem(args, rng):
+    # Generate problem writing it directly to disk. Only the number of
+    # tasks of each process is kept in memory. Return (number of items,
+    # number of edges, weight sums) tuple
+    value_min, value_max = (float(x) for x in args.value_range.split(","))
+    weight_min, weight_max = (float(x) for x in args.weight_range.split(","))
+    array_min, array_max = (int(x) for x in args.array_size.split(","))
+    avg_in_degree = args.dep_prob if args.avg_in_degree is None else args.avg_in_degree
+    fmt = "%.2f" if args.floats else "%d"
+
+    array_sizes = array.array("I")
+    weight_sums = [0] * args.num_weights
+    num_items = 0
+    num_edges = 0
+    with open(args.spec_out, "w") as spec_file, open(args.deps_out, "w") as deps_file:
+        for i in range(args.num_processes):
+            # Generate process, array processes have several tasks
+            # with the same value and weights
+            if args.array_prob > 0 and rng.random() < args.array_prob:
+                array_sizes.append(rng.randint(array_min, array_max))
+            else:
+                array_sizes.append(0)
+            value = random_number(rng, value_min, value_max, args.floats)
+            weights = [random_number(rng, weight_min, weight_max, args.floats) for _ in range(args.num_weights)]
+            item_fields = " ".join([fmt % value] + [fmt % w for w in weights])
+            item_names = get_item_names(i, array_sizes)
+            for name in item_names:
+                spec_file.write("%s %s\n" % (name, item_fields))
+            num_items += len(item_names)
+            for w in range(args.num_weights):
+                weight_sums[w] += weights[w] * len(item_names)
+
+            # Generate dependencies on earlier processes
+            for j in sample_predecessors(args, rng, i, avg_in_degree):
+                predecessor = get_random_item_name(rng, j, array_sizes)
+                for name in item_names:
+                    deps_file.write("%s %s\n" % (name, predecessor))
+                num_edges += len(item_names)
+
+            # Optionally add "must go together" pairs (mutual edges)
+            if i > 0 and args.together_prob > 0 and rng.random() < args.together_prob:
+                name = rng.choice(item_names)
+                other = get_random_item_name(rng, rng.randint(0, i - 1), array_sizes)
+                deps_file.write("%s %s\n%s %s\n" % (name, other, other, name))
+                num_edges += 2
+
+    if num_edges == 0:
+        os.remove(args.deps_out)
+
+    return num_items, num_edges, weight_sums
+
+##################################################
+def compute_capacities_from_sums(weight_sums, ratio, as_float):
+    fmt = "%.2f" if as_float else "%d"
+    return [fmt % (total * ratio) if as_float else fmt % int(round(total * ratio))
+            for total in weight_sums]
+
 ##################################################
 def main():
     args = parse_args()
     rng = random.Random(args.seed)
 
-    names, values, weights = generate_processes(args, rng)
-    edges = generate_deps(args, rng, names)
+    if args.stream:
+        num_items, num_edges, weight_sums = stream_problem(args, rng)
+        capacities = compute_capacities_from_sums(weight_sums, args.capacity_ratio, args.floats)
+    else:
+        names, values, weights = generate_processes(args, rng)
+        edges = generate_deps(args, rng, names)
 
-    write_spec_file(args.spec_out, names, values, weights, args.floats)
-    if edges:
-        write_deps_file(args.deps_out, edges)
+        write_spec_file(args.spec_out, names, values, weights, args.floats)
+        if edges:
+            write_deps_file(args.deps_out, edges)
 
-    capacities = compute_capacities(weights, args.capacity_ratio, args.floats)
+        capacities = compute_capacities(weights, args.capacity_ratio, args.floats)
+        num_items = len(names)
+        num_edges = len(edges)
 
     print("Generated %d processes with %d weight dimension(s)." %
           (args.num_processes, args.num_weights))
+    if num_items != args.num_processes:
+        print("Array processes expanded to %d items." % num_items)
     print("Spec file: %s" % args.spec_out)
-    if edges:
-        print("Deps file: %s (%d edges)" % (args.deps_out, len(edges)))
+    if num_edges:
+        print("Deps file: %s (%d edges)" % (args.deps_out, num_edges))
     else:
         print("Deps file: not generated (no edges produced)")
     print("")
     print("Suggested command:")
     cmd = "python3 debasher_solve_knapsack_greedy.py -s %s -c %s" % (
         args.spec_out, ",".join(capacities))
-    if edges:
+    if num_edges:
         cmd += " -d %s" % args.deps_out
     print(cmd)
 
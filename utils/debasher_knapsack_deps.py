@@ -0,0 +1,206 @@
+"""
+DeBasher package
+Copyright 2019-2026 Daniel Ortiz-Mart\'inez
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation; either version 3
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with this program; If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# *- python -*
+
+# import modules
+import sys
+
+##############################################################################
+# Precedence constraints shared by the knapsack solvers
+#
+# Predecessors are given as a "successor predecessor" pair per line, and
+# are turned into predecessor closures represented as integer bitmasks.
+##############################################################################
+
+##################################################
+def extract_deps_info(depsfile, items):
+    # Every process starts with an empty predecessor list; entries
+    # in the deps file add to it. One "successor predecessor" pair
+    # per line.
+    #
+    # A predecessor that is NOT among the current candidate
+    # processes is assumed to have already run in a previous stage
+    # (e.g. a pipelined execution where completed processes are no
+    # longer passed to the solver). In that case the dependency is
+    # already satisfied and imposes no further constraint here.
+    #
+    # A successor that is NOT among the current candidate processes
+    # simply has nothing to constrain in this run, so the edge is
+    # skipped too.
+    preds_by_name = {name: [] for name in items}
+    item_set = set(items)
+
+    file = open(depsfile, 'r')
+    for entry in file:
+        entry = entry.strip()
+        if not entry:
+            continue
+        fields = entry.split()
+        successor, predecessor = fields[0], fields[1]
+
+        if successor not in item_set:
+            print("Note: successor '%s' not found among current processes, "
+                  "ignoring dependency on '%s'" % (successor, predecessor),
+                  file=sys.stderr)
+            continue
+
+        if predecessor not in item_set:
+            print("Note: predecessor '%s' of '%s' not found among current "
+                  "processes, assuming it already ran" % (predecessor, successor),
+                  file=sys.stderr)
+            continue
+
+        preds_by_name[successor].append(predecessor)
+    file.close()
+
+    return preds_by_name
+
+##################################################
+def compute_sccs(direct_preds):
+    # Obtain the strongly connected components of the graph whose arcs
+    # go from each process to its direct predecessors (iterative
+    # version of Tarjan's algorithm, so long dependency chains do not
+    # exceed the recursion limit). Components are returned in reverse
+    # topological order, i.e. each component comes after all the
+    # components containing its predecessors
+    n = len(direct_preds)
+    index = [-1] * n
+    lowlink = [0] * n
+    on_stack = [False] * n
+    stack = []
+    sccs = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            v, pos = work[-1]
+            if pos < len(direct_preds[v]):
+                work[-1] = (v, pos + 1)
+                p = direct_preds[v][pos]
+                if index[p] == -1:
+                    index[p] = lowlink[p] = counter
+                    counter += 1
+                    stack.append(p)
+                    on_stack[p] = True
+                    work.append((p, 0))
+                elif on_stack[p] and index[p] < lowlink[v]:
+                    lowlink[v] = index[p]
+            else:
+                work.pop()
+                if work and lowlink[v] < lowlink[work[-1][0]]:
+                    lowlink[work[-1][0]] = lowlink[v]
+                if lowlink[v] == index[v]:
+                    scc = []
+                    while True:
+                        p = stack.pop()
+                        on_stack[p] = False
+                        scc.append(p)
+                        if p == v:
+                            break
+                    sccs.append(scc)
+
+    return sccs
+
+##################################################
+def compute_ancestors(items, preds_by_name):
+    # Precompute, for each process, the full set of transitive
+    # predecessors required, directly or indirectly. Sets are
+    # represented as integer bitmasks (bit i set means process i is
+    # required).
+    #
+    # A cycle in this graph (e.g. A requires B and B requires A) is
+    # not an error: it simply means all processes in the cycle must
+    # always be selected together. The graph is condensed into its
+    # strongly connected components, whose closure is computed once
+    # and shared by all of their processes (processes in a cycle are
+    # ancestors of themselves). An informational note is printed so
+    # unintended cycles (typos) don't pass unnoticed.
+    index_of = {name: i for i, name in enumerate(items)}
+    direct_preds = []
+    for name in items:
+        direct_preds.append([index_of[p] for p in preds_by_name.get(name, [])])
+
+    ancestors = [0] * len(items)
+    update_ancestors(items, direct_preds, ancestors, range(len(items)))
+    return ancestors
+
+##################################################
+def update_ancestors(items, direct_preds, ancestors, affected):
+    # Recompute in place the closures of the processes given in
+    # affected, which should contain every process depending on them,
+    # from their direct predecessors (lists of indices). The closures of
+    # the remaining processes are used as they are
+    affected = sorted(affected)
+    position = {i: k for k, i in enumerate(affected)}
+    sub_preds = [[position[p] for p in direct_preds[i] if p in position] for i in affected]
+
+    sccs = compute_sccs(sub_preds)
+    component = [0] * len(affected)
+    for c, scc in enumerate(sccs):
+        for k in scc:
+            component[k] = c
+
+    closures = []
+    for c, scc in enumerate(sccs):
+        closure = 0
+        cyclic = len(scc) > 1
+        for k in scc:
+            for p in direct_preds[affected[k]]:
+                if p not in position:
+                    closure |= ancestors[p] | (1 << p)
+                elif component[position[p]] == c:
+                    cyclic = True
+                else:
+                    closure |= closures[component[position[p]]] | (1 << p)
+        if cyclic:
+            for k in scc:
+                closure |= 1 << affected[k]
+            print_cycle_note(items, sorted(affected[k] for k in scc))
+        closures.append(closure)
+
+    for k, i in enumerate(affected):
+        ancestors[i] = closures[component[k]]
+
+##################################################
+def print_cycle_note(items, scc):
+    if len(scc) <= 2:
+        print("Note: '%s' and '%s' form a dependency cycle, they "
+              "will always be selected together" % (items[scc[0]], items[scc[-1]]),
+              file=sys.stderr)
+    else:
+        print("Note: %s form a dependency cycle, they will always be "
+              "selected together" % ", ".join("'%s'" % items[i] for i in scc),
+              file=sys.stderr)
+
+##################################################
+def get_items_from_bitmask(bitmask):
+    # Return indices of the bits set in bitmask, in increasing order
+    result = []
+    while bitmask:
+        lowest_bit = bitmask & -bitmask
+        result.append(lowest_bit.bit_length() - 1)
+        bitmask ^= lowest_bit
+    return result
@@ -0,0 +1,167 @@
+"""
+DeBasher package
+Copyright 2019-2026 Daniel Ortiz-Mart\'inez
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation; either version 3
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with this program; If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# *- python -*
+
+# import modules
+import sys
+import time
+from debasher_knapsack_deps import get_items_from_bitmask
+
+##############################################################################
+# Multidimensional 0-1 Knapsack Problem with precedence constraints
+# solved by means of depth-first branch and bound
+#
+# Precedence constraints are given as predecessor closures: ancestors[i]
+# is a bitmask with the items that should be packed if item i is packed.
+# Selecting an item packs the item together with its ancestors, and
+# discarding an item discards the items depending on it, so every node
+# of the search tree corresponds to a feasible solution.
+##############################################################################
+
+# Constants
+EXACT_VALUE_TOLERANCE = 1e-9
+EXACT_DEADLINE_CHECK_NODES = 1024
+
+##################################################
+def get_dependents(ancestors):
+    # Return bitmasks with the items depending on each item
+    dependents = [0] * len(ancestors)
+    for j in range(len(ancestors)):
+        for i in get_items_from_bitmask(ancestors[j]):
+            dependents[i] |= 1 << j
+    return dependents
+
+##################################################
+def get_resource_orders(weights, values):
+    # Return, for each resource, the items with positive value sorted by
+    # decreasing value/weight ratio. Items not consuming the resource
+    # come first
+    orders = []
+    for r in range(len(weights)):
+        items = [i for i in range(len(values)) if values[i] > 0]
+        items.sort(key=lambda i: values[i] / weights[r][i] if weights[r][i] > 0 else float("inf"),
+                   reverse=True)
+        orders.append(items)
+    return orders
+
+##################################################
+def upper_bound(weights, values, residual, orders, free):
+    # Bound the value that can be added to a solution using the free
+    # items. For each resource, the fractional knapsack relaxation
+    # restricted to that resource is solved, and the minimum over the
+    # resources is returned (precedence constraints are ignored)
+    bound = float("inf")
+    for r in range(len(weights)):
+        remaining = residual[r]
+        resource_bound = 0.0
+        for i in orders[r]:
+            if not free >> i & 1:
+                continue
+            w = weights[r][i]
+            if w <= remaining:
+                resource_bound += values[i]
+                remaining -= w
+            else:
+                resource_bound += values[i] * remaining / w
+                break
+        if resource_bound < bound:
+            bound = resource_bound
+    return bound
+
+##################################################
+def knapsack_solve_exact(weights, values, capacities, ancestors, initial_items=None,
+                         deadline=None):
+    # Solve problem by means of branch and bound, using the solution
+    # given in initial_items (if any) as starting incumbent. Return
+    # (value, packed_items, optimal) tuple, where optimal is False if
+    # the deadline was reached before completing the search. Raise
+    # ValueError if some weight is negative
+    n = len(values)
+    num_res = len(capacities)
+    if any(weights[r][i] < 0 for r in range(num_res) for i in range(n)):
+        raise ValueError("exact solver requires non-negative weights")
+
+    dependents = get_dependents(ancestors)
+    orders = get_resource_orders(weights, values)
+
+    # Items are branched on in decreasing order of value/weight ratio,
+    # so good solutions are found early
+    def priority(i):
+        s = 0.0
+        for r in range(num_res):
+            if capacities[r] > 0:
+                s += weights[r][i] / capacities[r]
+        return values[i] / (s if s > 0 else 1e-9)
+    branch_order = sorted(range(n), key=priority, reverse=True)
+
+    # Initialize incumbent
+    if initial_items is None:
+        initial_items = []
+    best = [sum(values[i] for i in initial_items), sorted(initial_items)]
+    all_items = (1 << n) - 1
+    num_nodes = [0]
+    timed_out = [False]
+
+    def search(pos, selected, excluded, used, value):
+        # Check deadline periodically
+        num_nodes[0] += 1
+        if deadline is not None and num_nodes[0] % EXACT_DEADLINE_CHECK_NODES == 0 and time.time() > deadline:
+            timed_out[0] = True
+        if timed_out[0]:
+            return
+
+        # Every node corresponds to a feasible solution
+        if value > best[0] + EXACT_VALUE_TOLERANCE:
+            best[0] = value
+            best[1] = get_items_from_bitmask(selected)
+
+        # Prune node if it cannot improve the incumbent
+        free = all_items & ~(selected | excluded)
+        if not free:
+            return
+        residual = [capacities[r] - used[r] for r in range(num_res)]
+        if value + upper_bound(weights, values, residual, orders, free) <= best[0] + EXACT_VALUE_TOLERANCE:
+            return
+
+        # Obtain next undecided item
+        while not free >> branch_order[pos] & 1:
+            pos += 1
+        i = branch_order[pos]
+        bit = 1 << i
+
+        # Branch packing the item together with its missing ancestors
+        bundle = (ancestors[i] | bit) & ~selected
+        if not bundle & excluded:
+            bundle_items = get_items_from_bitmask(bundle)
+            new_used = list(used)
+            for j in bundle_items:
+                for r in range(num_res):
+                    new_used[r] += weights[r][j]
+            if all(new_used[r] <= capacities[r] for r in range(num_res)):
+                search(pos + 1, selected | bundle, excluded, new_used,
+                       value + sum(values[j] for j in bundle_items))
+
+        # Branch discarding the item together with its dependents
+        search(pos + 1, selected, excluded | bit | dependents[i], used, value)
+
+    # Recursion depth is bounded by the number of items
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 2 * n + 100))
+    search(0, 0, 0, [0] * num_res, 0)
+
+    return best[0], best[1], not timed_out[0]
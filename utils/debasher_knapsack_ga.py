@@ -22,6 +22,11 @@ along with this program; If not, see <http://www.gnu.org/licenses/>.
 import random
 import time
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 ##############################################################################
 # 0-1 Knapsack Problem solved using Genetic Algorithms
 #
@@ -177,3 +182,177 @@ def knapsack_solve(max_gen, pop_size, start_pop_with_zeroes, weights, values, ca
     packed_items = get_packed_items(best_fitted_chrom)
 
     return computed_value, packed_items
+
+##############################################################################
+# Vectorized version of the Genetic Algorithm implemented with NumPy
+#
+# The population is stored as a boolean matrix with one row per
+# chromosome, and precedence constraints are given as predecessor
+# closures (ancestors[i] is a bitmask with the items that should be packed
+# if item i is packed). Chromosomes are repaired after being created, so
+# they always satisfy both the capacities and the precedence constraints,
+# and their fitness is simply the total value of the packed items.
+##############################################################################
+
+# Constants
+GA_SEED = 31415
+GA_PARENT_ELIGIBILITY = 0.2
+GA_MUTATION_CHANCE = 0.1
+GA_PARENT_LOTTERY = 0.05
+
+##################################################
+class ChromosomeRepairer:
+    """
+    Repairs populations given as boolean matrices. The packed items are
+    first extended with their ancestors, then the items are kept in
+    priority order while they fit, and finally the items whose ancestors
+    were dropped are dropped too.
+    """
+    def __init__(self, weights, values, capacities, ancestors):
+        n = len(values)
+        self.weights = numpy.array(weights, dtype=float).reshape(len(capacities), n)
+        self.capacities = numpy.array(capacities, dtype=float)
+
+        # Items sorted by decreasing value/normalized-weight ratio
+        values_arr = numpy.array(values, dtype=float)
+        caps = numpy.where(self.capacities > 0, self.capacities, numpy.inf)
+        score = (self.weights / caps[:, None]).sum(axis=0)
+        score[score <= 0] = 1e-9
+        self.order = numpy.argsort(-(values_arr / score), kind="stable")
+        self.ordered_weights = self.weights[:, self.order]
+
+        # (successor, ancestor) pairs of the closures, grouped by
+        # successor and by ancestor so reductions can be computed with
+        # reduceat
+        succ = []
+        anc = []
+        if ancestors is not None:
+            for i in range(n):
+                bitmask = ancestors[i]
+                while bitmask:
+                    lowest_bit = bitmask & -bitmask
+                    succ.append(i)
+                    anc.append(lowest_bit.bit_length() - 1)
+                    bitmask ^= lowest_bit
+        succ = numpy.array(succ, dtype=numpy.intp)
+        anc = numpy.array(anc, dtype=numpy.intp)
+        self.by_succ = self.get_groups(succ, anc)
+        self.by_anc = self.get_groups(anc, succ)
+
+    def get_groups(self, keys, others):
+        # Return (group keys, group starts, other elements sorted by
+        # key) tuple
+        if len(keys) == 0:
+            return None
+        idx = numpy.argsort(keys, kind="stable")
+        sorted_keys = keys[idx]
+        starts = numpy.flatnonzero(numpy.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        return sorted_keys[starts], starts, others[idx]
+
+    def add_ancestors(self, pop):
+        # Pack the ancestors of the packed items
+        if self.by_anc is not None:
+            anc_keys, starts, succ = self.by_anc
+            pop[:, anc_keys] |= numpy.logical_or.reduceat(pop[:, succ], starts, axis=1)
+
+    def drop_orphans(self, pop):
+        # Drop the items with some ancestor not packed
+        if self.by_succ is not None:
+            succ_keys, starts, anc = self.by_succ
+            pop[:, succ_keys] &= ~numpy.logical_or.reduceat(~pop[:, anc], starts, axis=1)
+
+    def fit_capacities(self, pop):
+        # Keep packed items in priority order while they fit
+        ordered = pop[:, self.order]
+        for r in range(len(self.capacities)):
+            usage = numpy.cumsum(ordered * self.ordered_weights[r], axis=1)
+            ordered &= usage <= self.capacities[r]
+        pop[:, self.order] = ordered
+
+    def repair(self, pop):
+        self.add_ancestors(pop)
+        self.fit_capacities(pop)
+        self.drop_orphans(pop)
+
+##################################################
+def mutate_numpy(rng, pop, rows):
+    # Flip a random element of each of the given rows
+    cols = rng.integers(0, pop.shape[1], size=len(rows))
+    pop[rows, cols] ^= True
+
+##################################################
+def evolve_population_numpy(rng, pop, fitness_values, repairer, values_arr):
+    # Evolve population sorted by decreasing fitness, only evaluating
+    # the chromosomes that changed (the fitness of the rest is kept)
+    pop_size, num_items = pop.shape
+
+    # Determine parents as the n-best fitted individuals plus a small
+    # fraction of less fitted ones
+    parent_length = int(GA_PARENT_ELIGIBILITY * pop_size)
+    lottery = rng.random(pop_size) < GA_PARENT_LOTTERY
+    lottery[:parent_length] = False
+    parent_idx = numpy.r_[numpy.arange(parent_length), numpy.flatnonzero(lottery)]
+    parents = pop[parent_idx]
+    parents_fitness = fitness_values[parent_idx]
+
+    # Mutation lottery for parents
+    mutated = numpy.flatnonzero(rng.random(len(parents)) < GA_MUTATION_CHANCE)
+    mutate_numpy(rng, parents, mutated)
+
+    # Breed children using one point crossover
+    num_children = pop_size - len(parents)
+    if len(parents) > 0:
+        male = parents[rng.integers(0, len(parents), size=num_children)]
+        female = parents[rng.integers(0, len(parents), size=num_children)]
+        mixpoint = rng.integers(0, num_items + 1, size=num_children)
+        children = numpy.where(numpy.arange(num_items) < mixpoint[:, None], male, female)
+    else:
+        children = numpy.zeros((num_children, num_items), dtype=bool)
+    mutate_numpy(rng, children, numpy.flatnonzero(rng.random(num_children) < GA_MUTATION_CHANCE))
+
+    # Repair and evaluate changed chromosomes only
+    new_pop = numpy.concatenate((parents, children))
+    new_fitness = numpy.concatenate((parents_fitness, numpy.zeros(num_children)))
+    changed = numpy.r_[numpy.zeros(len(parents), dtype=bool), numpy.ones(num_children, dtype=bool)]
+    changed[mutated] = True
+    changed_pop = new_pop[changed]
+    repairer.repair(changed_pop)
+    new_pop[changed] = changed_pop
+    new_fitness[changed] = changed_pop @ values_arr
+
+    return new_pop, new_fitness
+
+##################################################
+def knapsack_solve_numpy(max_gen, pop_size, start_pop_with_zeroes, weights, values, capacities,
+                         ancestors=None, time_limit=-1):
+    # Set random number generator
+    rng = numpy.random.default_rng(GA_SEED)
+
+    # Get start time
+    start = time.time()
+
+    # Create starting population
+    num_items = len(values)
+    values_arr = numpy.array(values, dtype=float)
+    repairer = ChromosomeRepairer(weights, values, capacities, ancestors)
+    if start_pop_with_zeroes:
+        pop = numpy.zeros((pop_size, num_items), dtype=bool)
+    else:
+        pop = rng.random((pop_size, num_items)) < 0.5
+    repairer.repair(pop)
+    fitness_values = pop @ values_arr
+
+    # Compute generations
+    for g in range(max_gen):
+        idx = numpy.argsort(-fitness_values, kind="stable")
+        pop, fitness_values = evolve_population_numpy(rng, pop[idx], fitness_values[idx], repairer, values_arr)
+        curr = time.time()-start
+        if time_limit > 0 and curr > time_limit:
+            break
+
+    # Obtain solution
+    best = int(numpy.argmax(fitness_values))
+    computed_value = fitness_values[best].item()
+    packed_items = numpy.flatnonzero(pop[best]).tolist()
+
+    return computed_value, packed_items
@@ -23,6 +23,9 @@ import io
 import sys
 import re
 import os
+import pickle
+import hashlib
+import json
 
 # Constants
 NONE_PROCESS_DEP = "none"
@@ -30,6 +33,9 @@ PROCSPEC_FEXT = "procspec"
 PRGOPTS_FEXT = "opts"
 PRGOPTS_EXHAUSTIVE_FEXT = "opts_exh"
 FIFOS_FEXT = "fifos"
+PRGCACHE_FEXT = "prgcache"
+PRGCACHE_SIG_FEXT = "prgcache_sig"
+PRGCACHE_VERSION = 4
 ARG_SEP = "<_ARG_SEP_>"
 ASSOC_ARRAY_ELEM_SEP = "__ELEMSEP__"
 ASSOC_ARRAY_KEY_LEN = "__LEN__"
@@ -47,6 +53,11 @@ FIFO_ARC_STYLE = "dashed"
 DEP_GRAPH_LINESTYLE_SEP_INT = "dashed"
 DEP_GRAPH_LINESTYLE_SEP_COMMA = "solid"
 DEP_GRAPH_LINESTYLE_SEP_VOID = "solid"
+LINE_WRITER_CHUNK_LINES = 65536
+EXPORT_FORMAT_JSON = "json"
+EXPORT_FORMAT_NDJSON = "ndjson"
+TASK_IDX_NUMBER_RE = re.compile(r"\d+")
+EXPORT_RECORD_GROUPS = {"process": "processes", "dep": "deps", "option": "options", "arc": "arcs", "fifo": "fifos"}
 
 ##################################################
 class DirectedGraph:
@@ -84,76 +95,291 @@ class DirectedGraph:
             result += f"{vertex} -> [{neighbors}]\n"
         return result
 
+##################################################
+class BufferedLineWriter:
+    # Accumulate output lines (graph representations, exported records)
+    # and write them in large chunks, either to standard output or to
+    # the given file
+    def __init__(self, out_fname=None, chunk_lines=LINE_WRITER_CHUNK_LINES):
+        if out_fname is None:
+            self.file = sys.stdout
+            self.file_owned = False
+        else:
+            self.file = open(out_fname, 'w')
+            self.file_owned = True
+        self.chunk_lines = chunk_lines
+        self.lines = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Lines written before an exception are not lost
+        self.close()
+        return False
+
+    def print(self, *elems):
+        # Elements are converted and separated by spaces, as with the
+        # builtin print
+        self.lines.append(" ".join(map(str, elems)))
+        if len(self.lines) >= self.chunk_lines:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.lines.append("")
+            self.file.write("\n".join(self.lines))
+            self.lines = []
+
+    def close(self):
+        self.flush()
+        if self.file_owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+##################################################
+def export_records(records, export_format, out_fname=None):
+    # Write graph records either as a single JSON object, with records
+    # grouped by type, or as NDJSON (one record per line), which is
+    # streamed without keeping the records in memory
+    with BufferedLineWriter(out_fname) as out:
+        if export_format == EXPORT_FORMAT_NDJSON:
+            for record in records:
+                out.print(json.dumps(record))
+        else:
+            groups = {}
+            for group in EXPORT_RECORD_GROUPS.values():
+                groups[group] = []
+            for record in records:
+                group = EXPORT_RECORD_GROUPS[record.pop("type")]
+                groups[group].append(record)
+            for group in list(groups):
+                if not groups[group]:
+                    del groups[group]
+            out.print(json.dumps(groups))
+
+##################################################
+class PrgFilesCache:
+    # On-disk cache storing the information extracted from program
+    # files. Each cached element is stored in its own file, together with
+    # the content hashes of the files it was obtained from, and it is
+    # discarded as soon as any of these files changes. The full
+    # signatures (mtime, size and content hash) are kept in a separate
+    # small file, so refreshing them never rewrites the cached data
+    def __init__(self, prg_files_pref):
+        self.prg_files_pref = prg_files_pref
+        self.signatures = {}
+        self.stale_keys = set()
+
+    def get_prgcache_fname(self, key):
+        return self.prg_files_pref + "." + key + "." + PRGCACHE_FEXT
+
+    def get_prgcache_sig_fname(self, key):
+        return self.prg_files_pref + "." + key + "." + PRGCACHE_SIG_FEXT
+
+    def write(self, fname, objs):
+        # Files are written atomically, so concurrent readers never see
+        # a partially written element
+        tmp_fname = fname + "." + str(os.getpid())
+        try:
+            with open(tmp_fname, 'wb') as file:
+                for obj in objs:
+                    pickle.dump(obj, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_fname, fname)
+        except OSError:
+            if os.path.exists(tmp_fname):
+                os.remove(tmp_fname)
+
+    def load_signatures(self, key):
+        if key not in self.signatures:
+            self.signatures[key] = None
+            try:
+                with open(self.get_prgcache_sig_fname(key), 'rb') as file:
+                    version, signatures = pickle.load(file)
+                if version == PRGCACHE_VERSION:
+                    self.signatures[key] = signatures
+            except Exception:
+                pass
+        return self.signatures[key]
+
+    def get_file_hash(self, fname):
+        hash = hashlib.sha1()
+        with open(fname, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                hash.update(block)
+        return hash.hexdigest()
+
+    def get_file_signature(self, fname, prev_signature=None):
+        # The content hash is only recomputed if mtime or size changed
+        stat = os.stat(fname)
+        if prev_signature is not None and prev_signature[0] == stat.st_mtime_ns and prev_signature[1] == stat.st_size:
+            return prev_signature
+        return stat.st_mtime_ns, stat.st_size, self.get_file_hash(fname)
+
+    def get_file_signatures(self, key, fnames):
+        # Signatures should be obtained before reading the files, so
+        # changes made while reading them invalidate the cached element
+        prev_signatures = self.load_signatures(key)
+        if prev_signatures is None or len(prev_signatures) != len(fnames):
+            prev_signatures = [None] * len(fnames)
+        return [self.get_file_signature(fname, prev_signature) for fname, prev_signature in zip(fnames, prev_signatures)]
+
+    def get(self, key, signatures):
+        # The cached data is only unpickled if the content hashes match
+        try:
+            with open(self.get_prgcache_fname(key), 'rb') as file:
+                version, hashes = pickle.load(file)
+                if version != PRGCACHE_VERSION or hashes != [signature[2] for signature in signatures]:
+                    return None
+                data = pickle.load(file)
+        except Exception:
+            return None
+        # Refreshed signatures are written by flush(), so the hash is
+        # not recomputed next time
+        if self.load_signatures(key) != signatures:
+            self.signatures[key] = signatures
+            self.stale_keys.add(key)
+        return data
+
+    def set(self, key, signatures, data):
+        hashes = [signature[2] for signature in signatures]
+        self.write(self.get_prgcache_fname(key), [(PRGCACHE_VERSION, hashes), data])
+        self.signatures[key] = signatures
+        self.stale_keys.add(key)
+        self.flush()
+
+    def flush(self):
+        for key in self.stale_keys:
+            self.write(self.get_prgcache_sig_fname(key), [(PRGCACHE_VERSION, self.signatures[key])])
+        self.stale_keys = set()
+
 ##################################################
 class processdep_data:
     def __init__(self):
         self.deptype = None
         self.processname = None
 
+##################################################
+class process_spec_data:
+    # Compact record with the information extracted from a process
+    # specification entry
+    __slots__ = ("name", "lineno", "entry", "fields", "time", "mem", "cpus", "separator", "deps")
+
+    def __init__(self):
+        self.name = None
+        self.lineno = None
+        self.entry = None
+        self.fields = None
+        self.time = ""
+        self.mem = ""
+        self.cpus = ""
+        self.separator = ""
+        self.deps = []
+
 ##################################################
 class DependencyGraph:
-    def __init__(self, prg_files_pref):
+    def __init__(self, prg_files_pref, use_cache=False):
         self.procspec_file = self.get_procspec_fname(prg_files_pref)
-        self.entries_lineno, self.process_entries = self.extract_process_entries(self.procspec_file)
-        self.multiattempt_processes = self.extract_processes_with_multiattempt(self.process_entries)
-        self.deps_syntax_ok, self.processdeps_sep, self.processdeps_map = self.extract_processdeps_info(self.entries_lineno, self.process_entries)
+        self.cache = PrgFilesCache(prg_files_pref) if use_cache else None
+        if not self.load_from_cache():
+            self.deps_syntax_ok, self.process_specs = self.extract_process_specs(self.procspec_file)
+            self.multiattempt_processes = self.extract_processes_with_multiattempt_from_specs(self.process_specs)
+            self.processdeps_sep, self.processdeps_map = self.extract_processdeps_info_from_specs(self.process_specs)
+            self.ancestor_index = None
+            self.process_order = None
+            self.cache_up_to_date = False
+        self.entries_lineno = [spec.lineno for spec in self.process_specs]
+        self.process_entries = [spec.entry for spec in self.process_specs]
+
+    def load_from_cache(self):
+        if self.cache is None:
+            return False
+        self.cache_signatures = self.cache.get_file_signatures("dep_graph", [self.procspec_file])
+        data = self.cache.get("dep_graph", self.cache_signatures)
+        if data is None:
+            return False
+        self.deps_syntax_ok, self.process_specs, self.multiattempt_processes, self.processdeps_sep, self.processdeps_map, self.ancestor_index, self.process_order = data
+        self.cache_up_to_date = True
+        return True
+
+    def save_to_cache(self):
+        # Only correct process specifications are stored, so that cache
+        # hits never skip error messages. The ancestor index is stored
+        # only if it was required, since it may be large
+        if self.cache is None or not self.deps_syntax_ok or self.process_order is None:
+            return
+        if self.cache_up_to_date:
+            self.cache.flush()
+            return
+        data = self.deps_syntax_ok, self.process_specs, self.multiattempt_processes, self.processdeps_sep, self.processdeps_map, self.ancestor_index, self.process_order
+        self.cache.set("dep_graph", self.cache_signatures, data)
+        self.cache_up_to_date = True
 
     def get_dep_info(self):
         dep_info = {}
-        for entry in self.process_entries:
-            # Extract dependencies for process
-            prname = self.extract_process_name(entry)
-            processdeps = set()
-            self.extract_all_deps_for_process(prname, processdeps)
-            # Add dependencies to dictionary
-            deplist = []
-            for process in processdeps:
-                deplist.append(process)
-            dep_info[prname] = deplist
+        for spec in self.process_specs:
+            # Add dependencies of process to dictionary
+            dep_info[spec.name] = self.get_all_deps_for_process(spec.name)
         return dep_info
 
     def get_procspec_fname(self, prefix):
         return prefix + "." + PROCSPEC_FEXT
 
-    def extract_process_entries(self, procspec_file):
-        entries_lineno = []
-        process_entries = []
-        file = open(self.procspec_file, 'r')
+    def extract_process_specs(self, procspec_file):
+        # Parse the process specification file in a single pass, each
+        # entry is split only once
+        deps_syntax_ok = True
+        process_specs = []
+        file = open(procspec_file, 'r')
         # read file entry by entry
         lineno = 1
         for entry in file:
             entry = entry.strip("\n")
-            if not self.entry_is_comment(entry) and not self.entry_is_empty(entry):
-                process_entries.append(entry)
-                entries_lineno.append(lineno)
-            lineno=lineno+1
-
-        return entries_lineno, process_entries
+            fields = entry.split()
+            if len(fields) > 0 and fields[0][0] != "#":
+                spec_syntax_ok, spec = self.gen_process_spec(lineno, entry, fields)
+                if not spec_syntax_ok:
+                    deps_syntax_ok = False
+                process_specs.append(spec)
+            lineno = lineno+1
+        file.close()
+
+        return deps_syntax_ok, process_specs
+
+    def gen_process_spec(self, lineno, entry, fields):
+        spec = process_spec_data()
+        spec.name = fields[0]
+        spec.lineno = lineno
+        spec.entry = entry
+        spec.fields = tuple(fields)
+
+        # Extract attributes (only the first occurrence of time, mem and
+        # cpus and the last one of processdeps are considered)
+        pdeps_str = ""
+        for f in fields:
+            if f.startswith("time="):
+                if not spec.time:
+                    spec.time = f[5:]
+            elif f.startswith("mem="):
+                if not spec.mem:
+                    spec.mem = f[4:]
+            elif f.startswith("cpus="):
+                if not spec.cpus:
+                    spec.cpus = f[5:]
+            elif f.startswith("processdeps="):
+                pdeps_str = f[len("processdeps="):]
 
-    def entry_is_comment(self, entry):
-        fields = entry.split()
-        if len(fields) == 0:
-            return False
-        elif fields[0][0] == "#":
-            return True
-        else:
-            return False
+        # Extract dependencies
+        deps_syntax_ok, spec.separator, spec.deps = self.extract_process_deps_from_str(lineno, pdeps_str)
 
-    def entry_is_empty(self, entry):
-        fields = entry.split()
-        if len(fields) == 0:
-            return True
-        else:
-            return False
+        return deps_syntax_ok, spec
 
-    def extract_processes_with_multiattempt(self, process_entries):
+    def extract_processes_with_multiattempt_from_specs(self, process_specs):
         multiattempt_processes = set()
-        for i in range(len(process_entries)):
-            prname = self.extract_process_name(process_entries[i])
-            time_value = self.extract_time_value(process_entries[i])
-            mem_value = self.extract_mem_value(process_entries[i])
-            if(self.str_contains_commas(time_value) or self.str_contains_commas(mem_value)):
-                multiattempt_processes.add(prname)
+        for spec in process_specs:
+            if(self.str_contains_commas(spec.time) or self.str_contains_commas(spec.mem)):
+                multiattempt_processes.add(spec.name)
         return multiattempt_processes
 
     def str_contains_commas(self, str):
@@ -162,66 +388,28 @@ class DependencyGraph:
         else:
             return False
 
-    def extract_time_value(self, entry):
-        fields = entry.split()
-        i = 0
-        found = False
-        value = ""
-        while i<len(fields) and not found:
-            if fields[i].find("time=") == 0:
-                found = True
-                value = fields[i][5:]
-            else:
-                i = i+1
-        return value
-
-    def extract_mem_value(self, entry):
-        fields = entry.split()
-        i = 0
-        found = False
-        value = ""
-        while i<len(fields) and not found:
-            if fields[i].find("mem=") == 0:
-                found = True
-                value = fields[i][4:]
-            else:
-                i = i+1
-        return value
-
-    def extract_processdeps_info(self, entries_lineno, process_entries):
+    def extract_processdeps_info_from_specs(self, process_specs):
         processdeps_map = {}
         processdeps_sep = {}
+        for spec in process_specs:
+            processdeps_sep[spec.name] = spec.separator
+            processdeps_map[spec.name] = spec.deps
+        return processdeps_sep, processdeps_map
+
+    def extract_process_deps_from_str(self, entry_lineno, pdeps_str):
         deps_syntax_ok = True
-        for i in range(len(process_entries)):
-            fields = process_entries[i].split()
-            prname = self.extract_process_name(process_entries[i])
-            dep_syntax_ok, separator, deps = self.extract_process_deps(entries_lineno[i], process_entries[i])
-            if(not dep_syntax_ok):
-                deps_syntax_ok=False
-            processdeps_sep[prname] = separator
-            processdeps_map[prname] = deps
-        return deps_syntax_ok, processdeps_sep, processdeps_map
-
-    def extract_process_deps(self, entry_lineno, entry):
-        deps_syntax_ok = True
-        # extract text field
-        fields = entry.split()
-        pdeps_str = ""
-        for f in fields:
-            if f.find("processdeps=") == 0:
-                pdeps_str = f[len("processdeps="):]
 
         # Return empty list of process dependencies if corresponding field was
         # not found
         if len(pdeps_str)==0:
-            return deps_syntax_ok, []
+            return deps_syntax_ok, '', []
 
         # Check that dependency separators (, and ?) are not mixed
         seps_mixed, separator = self.get_dep_separator(pdeps_str)
         if seps_mixed:
             deps_syntax_ok = False
             print("Error: dependency separators mixed in process dependency (", pdeps_str, ") at line number", entry_lineno, file=sys.stderr)
-            return deps_syntax_ok, []
+            return deps_syntax_ok, separator, []
 
         # create list of process dependencies
         pdeps_list=[]
@@ -254,7 +442,7 @@ class DependencyGraph:
             return False, ''
 
     def syntax_ok(self):
-        return self.syntax_ok
+        return self.deps_syntax_ok
 
     def prname_valid(self, prname):
         for c in prname:
@@ -288,19 +476,16 @@ class DependencyGraph:
 
     def processnames_duplicated(self):
         processnames=set()
-        lineno=1
-        for i in range(len(self.process_entries)):
-            prname = self.extract_process_name(self.process_entries[i])
-            if prname in processnames:
-                print("Error: process", prname, "in line", entries_lineno[i], "is duplicated", file=sys.stderr)
+        for spec in self.process_specs:
+            if spec.name in processnames:
+                print("Error: process", spec.name, "in line", spec.lineno, "is duplicated", file=sys.stderr)
                 return True
             else:
-                processnames.add(prname)
-            lineno=lineno+1
+                processnames.add(spec.name)
         return False
 
     def extract_process_name(self, entry):
-        fields=entry.split()
+        fields=entry.split(None, 1)
         if len(fields) == 0:
             return ""
         else:
@@ -324,34 +509,92 @@ class DependencyGraph:
         return True
 
     def order_process_entries(self, ordered_process_entries):
-        processed_processes=set()
-        # Add processes to ordered processes list incrementally
-        while len(processed_processes) != len(self.processdeps_map):
-            prev_proc_processes_len=len(processed_processes)
-            # Explore list of process entries
-            for entry in self.process_entries:
-                prname = self.extract_process_name(entry)
-                if self.processname_can_be_added(prname, processed_processes):
-                    processed_processes.add(prname)
-                    ordered_process_entries.append(entry)
-            # Check if no processes were added
-            if(prev_proc_processes_len==len(processed_processes)):
-                print("Error: the process dependencies contain at least one cycle", file=sys.stderr)
-                return ordered_process_entries
+        # The resulting order is the one obtained by repeatedly scanning
+        # the process entries in file order, adding each process whose
+        # dependencies were already added. Instead of rescanning the
+        # entries, the pass in which each process would be added is
+        # computed in topological order (a dependency located later in
+        # the file delays the process to the next pass)
+        if self.process_order is not None:
+            ordered_process_entries.extend(self.process_specs[i].entry for i in self.process_order)
+            return ordered_process_entries
+
+        prnames = [spec.name for spec in self.process_specs]
+        position = {prname: i for i, prname in enumerate(prnames)}
+        indegree, successors = self.gen_indegree_index()
+
+        # Obtain pass number for each process (Kahn's algorithm)
+        process_pass = {}
+        pending = [prname for prname in prnames if indegree[prname] == 0]
+        for prname in pending:
+            process_pass[prname] = 0
+        while pending:
+            prname = pending.pop()
+            for succ in successors[prname]:
+                succ_pass = process_pass[prname]
+                if position[prname] > position[succ]:
+                    succ_pass += 1
+                if process_pass.get(succ, -1) < succ_pass:
+                    process_pass[succ] = succ_pass
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    pending.append(succ)
+
+        # Distribute entries into passes preserving file order
+        passes = []
+        for i, prname in enumerate(prnames):
+            if prname in process_pass and indegree[prname] == 0:
+                while len(passes) <= process_pass[prname]:
+                    passes.append([])
+                passes[process_pass[prname]].append(i)
+        process_order = []
+        for pass_entries in passes:
+            process_order.extend(pass_entries)
+        ordered_process_entries.extend(self.process_specs[i].entry for i in process_order)
+
+        # Report processes involved in cycles, if any
+        if len(process_order) != len(self.process_specs):
+            cycle_processes = self.get_cycle_processes(indegree, successors)
+            print("Error: the process dependencies contain at least one cycle involving processes:", " ".join(sorted(cycle_processes, key=position.get)), file=sys.stderr)
+        else:
+            self.process_order = process_order
 
         return ordered_process_entries
 
-    def processname_can_be_added(self, prname, processed_processes):
-        # Check if process name has already been added
-        if prname in processed_processes:
-            return False
-
-        # Check if all dependencies for process name were processed
-        for elem in self.processdeps_map[prname]:
-            if(elem.processname not in processed_processes):
-                return False
-
-        return True
+    def gen_indegree_index(self):
+        # Obtain number of dependencies and list of dependent processes
+        # for each process (unrecognized dependencies are ignored)
+        indegree = {}
+        successors = {}
+        for prname in self.processdeps_map:
+            indegree[prname] = 0
+            successors[prname] = []
+        for prname in self.processdeps_map:
+            for elem in self.processdeps_map[prname]:
+                if elem.processname in successors:
+                    indegree[prname] += 1
+                    successors[elem.processname].append(prname)
+        return indegree, successors
+
+    def get_cycle_processes(self, indegree, successors):
+        # Processes with pending dependencies after the topological
+        # ordering are either part of a cycle or depend on one. The
+        # latter are removed by iteratively discarding processes with no
+        # pending dependent processes
+        blocked = set(prname for prname in indegree if indegree[prname] > 0)
+        outdegree = {}
+        for prname in blocked:
+            outdegree[prname] = sum(1 for succ in successors[prname] if succ in blocked)
+        pending = [prname for prname in blocked if outdegree[prname] == 0]
+        while pending:
+            prname = pending.pop()
+            blocked.discard(prname)
+            for elem in self.processdeps_map[prname]:
+                if elem.processname in blocked:
+                    outdegree[elem.processname] -= 1
+                    if outdegree[elem.processname] == 0:
+                        pending.append(elem.processname)
+        return blocked
 
     def get_graph_linestyle(self, separator):
         if separator=="?":
@@ -361,113 +604,402 @@ class DependencyGraph:
         elif separator=="":
             return DEP_GRAPH_LINESTYLE_SEP_VOID
 
-    def print(self):
-        # Print header
-        print("digraph G {")
-        print("overlap=false;")
-        print("splines=true;")
-        print("K=1;")
-
-        # Set representation for processes
-        print("node [shape = " + START_NODE_SHAPE + "];", "; ".join(["start"]))
-        print("node [shape = " + PROCESS_NODE_SHAPE + "];")
-
-        # Process processes
-        for process in self.processdeps_map:
-            line_style = self.get_graph_linestyle(self.processdeps_sep[process])
-            if len(self.processdeps_map[process]) == 0:
-                print("start", "->", process, "[ label= \"\" ,", "color = black ];")
-            else:
-                for elem in self.processdeps_map[process]:
-                    print('"'+elem.processname+'"', "->", process, "[ label= \""+elem.deptype+"\" ,","style=", line_style, ", color = black ];")
-
-        # Print footer
-        print("}")
+    def print(self, out_fname=None):
+        # Create writer for graph representation
+        with BufferedLineWriter(out_fname) as self.out:
+
+            # Print header
+            self.out.print("digraph G {")
+            self.out.print("overlap=false;")
+            self.out.print("splines=true;")
+            self.out.print("K=1;")
+
+            # Set representation for processes
+            self.out.print("node [shape = " + START_NODE_SHAPE + "];", "; ".join(["start"]))
+            self.out.print("node [shape = " + PROCESS_NODE_SHAPE + "];")
+
+            # Process processes
+            for process in self.processdeps_map:
+                line_style = self.get_graph_linestyle(self.processdeps_sep[process])
+                if len(self.processdeps_map[process]) == 0:
+                    self.out.print("start", "->", process, "[ label= \"\" ,", "color = black ];")
+                else:
+                    for elem in self.processdeps_map[process]:
+                        self.out.print('"'+elem.processname+'"', "->", process, "[ label= \""+elem.deptype+"\" ,","style=", line_style, ", color = black ];")
+
+            # Print footer
+            self.out.print("}")
+
+    def gen_export_records(self):
+        # Generate records for processes and their dependencies
+        for spec in self.process_specs:
+            yield {"type": "process",
+                   "name": spec.name,
+                   "lineno": spec.lineno,
+                   "cpus": spec.cpus,
+                   "mem": spec.mem,
+                   "time": spec.time,
+                   "separator": self.processdeps_sep[spec.name],
+                   "multiattempt": spec.name in self.multiattempt_processes}
+            for elem in self.processdeps_map[spec.name]:
+                yield {"type": "dep",
+                       "from": elem.processname,
+                       "to": spec.name,
+                       "deptype": elem.deptype}
+
+    def export(self, export_format, out_fname=None):
+        export_records(self.gen_export_records(), export_format, out_fname)
 
     def print_deps(self, ordered_process_entries):
         for entry in ordered_process_entries:
             # Extract dependencies for process
             prname = self.extract_process_name(entry)
-            processdeps = set()
-            self.extract_all_deps_for_process(prname, processdeps)
+            processdeps = self.get_all_deps_for_process(prname)
 
             # Print dependencies for process
-            depstr = ""
-            for dep in processdeps:
-                if(depstr==""):
-                    depstr = dep
-                else:
-                    depstr = depstr+" "+dep
-            print(prname, ":", depstr)
+            print(prname, ":", " ".join(processdeps))
+
+    def get_time_in_seconds(self, time_value):
+        # Convert time value to seconds. Accepted formats are those of
+        # the time attribute ("minutes", "minutes:seconds",
+        # "hours:minutes:seconds", "days-hours",
+        # "days-hours:minutes" and "days-hours:minutes:seconds"). For
+        # multi-attempt values, the first attempt is used. Processes
+        # without time value take zero seconds
+        time_value = time_value.split(",", 1)[0]
+        if not time_value:
+            return 0
+        try:
+            days = 0
+            if "-" in time_value:
+                days_str, time_value = time_value.split("-", 1)
+                days = int(days_str)
+                units = [3600, 60, 1]
+            else:
+                units = [60, 1] if time_value.count(":") < 2 else [3600, 60, 1]
+            fields = time_value.split(":")
+            if len(fields) > len(units):
+                return None
+            seconds = days * 86400
+            for i in range(len(fields)):
+                seconds += int(fields[i]) * units[i]
+            return seconds
+        except ValueError:
+            return None
+
+    def get_critical_path_info(self):
+        # Compute earliest and latest start times (in seconds) for each
+        # process over the dependency graph, visiting processes in
+        # topological order. An "after" dependency only requires the
+        # dependency to be started, while the rest of dependency types
+        # require it to be finished. Processes whose dependencies are
+        # separated by "?" can start as soon as any of them is
+        # satisfied, so they are only constrained by the dependency
+        # determining their earliest start
+        if self.process_order is None:
+            self.order_process_entries([])
+            if self.process_order is None:
+                return None
+
+        # Obtain duration of each process
+        prnames = [self.process_specs[i].name for i in self.process_order]
+        duration = {}
+        for i in self.process_order:
+            spec = self.process_specs[i]
+            duration[spec.name] = self.get_time_in_seconds(spec.time)
+            if duration[spec.name] is None:
+                print("Error: invalid time value", spec.time, "for process", spec.name, file=sys.stderr)
+                return None
+
+        # Obtain earliest start times and the dependencies determining
+        # them
+        earliest_start = {}
+        binding_deps = {}
+        for prname in prnames:
+            dep_starts = []
+            for elem in self.processdeps_map[prname]:
+                if elem.processname in earliest_start:
+                    lag = 0 if elem.deptype == "after" else duration[elem.processname]
+                    dep_starts.append((earliest_start[elem.processname] + lag, elem.processname, lag))
+            if not dep_starts:
+                earliest_start[prname] = 0
+                binding_deps[prname] = []
+                continue
+            if self.processdeps_sep[prname] == "?":
+                start = min(dep_start[0] for dep_start in dep_starts)
+                binding_deps[prname] = [dep_start[1:] for dep_start in dep_starts if dep_start[0] == start]
+            else:
+                start = max(dep_start[0] for dep_start in dep_starts)
+                binding_deps[prname] = [dep_start[1:] for dep_start in dep_starts]
+            earliest_start[prname] = start
+
+        # Obtain latest start times not delaying the total makespan
+        makespan = 0
+        for prname in prnames:
+            makespan = max(makespan, earliest_start[prname] + duration[prname])
+        latest_start = {}
+        for prname in prnames:
+            latest_start[prname] = makespan - duration[prname]
+        for prname in reversed(prnames):
+            for depname, lag in binding_deps[prname]:
+                latest_start[depname] = min(latest_start[depname], latest_start[prname] - lag)
+
+        # Obtain critical path, following binding dependencies with no
+        # slack backwards from the last process to finish
+        critical_path = []
+        prname = None
+        for name in prnames:
+            if earliest_start[name] + duration[name] == makespan and latest_start[name] == earliest_start[name]:
+                prname = name
+        while prname is not None:
+            critical_path.append(prname)
+            next_prname = None
+            for depname, lag in binding_deps[prname]:
+                if earliest_start[depname] + lag == earliest_start[prname] and latest_start[depname] == earliest_start[depname]:
+                    next_prname = depname
+                    break
+            prname = next_prname
+        critical_path.reverse()
+
+        return prnames, duration, earliest_start, latest_start, makespan, critical_path
+
+    def print_critical_path_info(self):
+        critical_path_info = self.get_critical_path_info()
+        if critical_path_info is None:
+            return False
+        prnames, duration, earliest_start, latest_start, makespan, critical_path = critical_path_info
+        for prname in prnames:
+            print(prname, ":", "duration=" + str(duration[prname]), "earliest_start=" + str(earliest_start[prname]), "latest_start=" + str(latest_start[prname]), "slack=" + str(latest_start[prname] - earliest_start[prname]))
+        print("Makespan:", makespan)
+        print("Critical path:", " ".join(critical_path))
+        return True
 
     def extract_all_deps_for_process(self, prname, result):
-        if prname in self.processdeps_map:
-            for processdep in self.processdeps_map[prname]:
-                result.add(processdep.processname)
-                self.extract_all_deps_for_process(processdep.processname, result)
+        result.update(self.get_all_deps_for_process(prname))
+
+    def get_all_deps_for_process(self, prname):
+        # Return direct and indirect dependencies of the process, in file
+        # order
+        prnames, bitsets = self.get_ancestor_index()
+        if prname not in bitsets:
+            return []
+        return self.get_prnames_from_bitset(prnames, bitsets[prname])
+
+    def get_prnames_from_bitset(self, prnames, bitset):
+        bits = format(bitset, "b")[::-1]
+        result = []
+        i = bits.find("1")
+        while i != -1:
+            result.append(prnames[i])
+            i = bits.find("1", i+1)
+        return result
+
+    def get_ancestor_index(self):
+        # The ancestor index maps each process to an integer bitset with
+        # its direct and indirect dependencies (bit i corresponds to the
+        # i-th process in file order). It is computed only once, visiting
+        # processes in topological order so the bitset of a process is
+        # obtained from those of its direct dependencies
+        if self.ancestor_index is not None:
+            return self.ancestor_index
+
+        prnames = list(self.processdeps_map)
+        position = {prname: i for i, prname in enumerate(prnames)}
+        indegree, successors = self.gen_indegree_index()
+
+        # Compute bitsets in topological order
+        bitsets = {}
+        pending = [prname for prname in prnames if indegree[prname] == 0]
+        while pending:
+            prname = pending.pop()
+            bitset = 0
+            for elem in self.processdeps_map[prname]:
+                if elem.processname in position:
+                    bitset |= bitsets[elem.processname] | (1 << position[elem.processname])
+            bitsets[prname] = bitset
+            for succ in successors[prname]:
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    pending.append(succ)
+
+        # Processes involved in or depending on cycles are handled by
+        # means of an iterative traversal of their dependencies
+        for prname in prnames:
+            if prname not in bitsets:
+                bitsets[prname] = self.get_dep_bitset_by_traversal(prname, position)
+
+        self.ancestor_index = prnames, bitsets
+        self.cache_up_to_date = False
+        return self.ancestor_index
+
+    def get_dep_bitset_by_traversal(self, prname, position):
+        bitset = 0
+        pending = [prname]
+        while pending:
+            curr = pending.pop()
+            for elem in self.processdeps_map[curr]:
+                if elem.processname not in position:
+                    continue
+                bit = 1 << position[elem.processname]
+                if not bitset & bit:
+                    bitset |= bit
+                    pending.append(elem.processname)
+        return bitset
+
+##################################################
+class OptionValueIndex:
+    # Inverted index over the options of all process tasks. Producers
+    # and consumers of a value are the tasks receiving it (it should be
+    # an absolute path) through an output or a non-output option,
+    # respectively. Entries are lists of (process, task_idx, opt) tuples
+    def __init__(self):
+        self.value_producers = {}
+        self.value_consumers = {}
+        self.opt_to_processes = {}
+
+    def get_value_producers(self, value):
+        return self.value_producers.get(value, [])
+
+    def get_value_consumers(self, value):
+        return self.value_consumers.get(value, [])
+
+    def get_opt_tasks(self, opt):
+        # Return list of (process_info, value) tuples for option
+        return self.opt_to_processes.get(opt, [])
 
 ##################################################
 class ProcessGraph:
-    def __init__(self, prg_files_pref):
+    def __init__(self, prg_files_pref, use_cache=False):
         self.prgopts_exhaustive_file = self.get_prgopts_exh_fname(prg_files_pref)
-        self.prgopts_exh = self.load_prgopt_exh(self.prgopts_exhaustive_file)
-        self.process_out_values = self.get_process_out_values(self.prgopts_exh)
         self.fifos_file = self.get_fifos_fname(prg_files_pref)
-        self.fifo_owners, self.fifo_users = self.load_fifos(self.fifos_file)
+        self.cache = PrgFilesCache(prg_files_pref) if use_cache else None
+        if not self.load_from_cache():
+            self.prgopts_exh = self.load_prgopt_exh(self.prgopts_exhaustive_file)
+            self.option_index = self.gen_option_value_index(self.prgopts_exh)
+            self.fifo_owners, self.fifo_users = self.load_fifos(self.fifos_file)
+            self.cache_up_to_date = False
+        self.process_out_values = self.option_index.value_producers
+
+    def get_cached_fnames(self):
+        return [self.prgopts_exhaustive_file, self.fifos_file]
+
+    def load_from_cache(self):
+        if self.cache is None:
+            return False
+        self.cache_signatures = self.cache.get_file_signatures("proc_graph", self.get_cached_fnames())
+        data = self.cache.get("proc_graph", self.cache_signatures)
+        if data is None:
+            return False
+        self.prgopts_exh, self.option_index, self.fifo_owners, self.fifo_users = data
+        self.cache_up_to_date = True
+        return True
+
+    def save_to_cache(self):
+        if self.cache is None:
+            return
+        if self.cache_up_to_date:
+            self.cache.flush()
+            return
+        data = self.prgopts_exh, self.option_index, self.fifo_owners, self.fifo_users
+        self.cache.set("proc_graph", self.cache_signatures, data)
+        self.cache_up_to_date = True
 
     def get_prgopts_exh_fname(self, prefix):
         return prefix + "." + PRGOPTS_EXHAUSTIVE_FEXT
 
     def load_prgopt_exh(self, prgopt_exh_fname):
+        # The file is processed in a streaming fashion. Lists of options
+        # are stored as tuples and repeated strings (option names and
+        # values shared by several tasks) are stored only once
         prgopts_exh = {}
-        file = open(prgopt_exh_fname, 'r')
-        # read file entry by entry
-        for entry in file:
-            # Extract entry information
-            words = entry.split()
-            process_info = words[0]
-            process_opts = "".join(words[2:])
-
-            # Extract elements of process info
-            process_info_elems = self.get_process_taskidx_elems_prg_file(process_info)
-            if len(process_info_elems) == 2:
-                processname = process_info_elems[0]
-                # Continue processing if the entry is not providing the
-                # number of tasks
-                if process_info_elems[1] != ASSOC_ARRAY_KEY_LEN:
-                    task_idx = int(process_info_elems[1])
-                    # Make room for options
-                    if processname not in prgopts_exh:
-                        prgopts_exh[processname] = []
-                    while len(prgopts_exh[processname]) <= task_idx:
-                        prgopts_exh[processname].append([])
-                    # Create list from process options
-                    opt_list = self.get_opt_list_prg_file(process_opts)
-                    prgopts_exh[processname][task_idx] = opt_list
+        str_table = {}
+        with open(prgopt_exh_fname, 'r') as file:
+            # read file entry by entry
+            for entry in file:
+                # Extract entry information
+                words = entry.split(None, 2)
+                if len(words) == 0:
+                    continue
+                process_info = words[0]
+                if len(words) == 3:
+                    process_opts = "".join(words[2].split())
+                else:
+                    process_opts = ""
+
+                # Extract elements of process info
+                processname, sep, task_idx_str = process_info.partition(ASSOC_ARRAY_ELEM_SEP)
+                if not sep or ASSOC_ARRAY_ELEM_SEP in task_idx_str:
+                    continue
+                if task_idx_str == ASSOC_ARRAY_KEY_LEN:
+                    # Make room for the options of all tasks
+                    num_tasks = int(process_opts)
+                    if num_tasks > 0:
+                        task_opts = prgopts_exh.setdefault(processname, [])
+                        if len(task_opts) < num_tasks:
+                            task_opts.extend([()] * (num_tasks - len(task_opts)))
+                else:
+                    task_idx = int(task_idx_str)
+                    task_opts = prgopts_exh.setdefault(processname, [])
+                    # Make room for options if the number of tasks was
+                    # not given
+                    if len(task_opts) <= task_idx:
+                        task_opts.extend([()] * (task_idx + 1 - len(task_opts)))
+                    # Create tuple from process options
+                    task_opts[task_idx] = tuple(str_table.setdefault(opt, opt) for opt in process_opts.split(ARG_SEP))
 
         return prgopts_exh
 
-    def get_opt_list_prg_file(self, process_opts):
-        return re.split(re.escape(ARG_SEP), process_opts)
-
     def get_process_taskidx_elems_prg_file(self, process_info):
-        return re.split(re.escape(ASSOC_ARRAY_ELEM_SEP), process_info)
-
-    def get_process_out_values(self, prgopts_exh):
-        process_out_values = {}
+        return process_info.split(ASSOC_ARRAY_ELEM_SEP)
+
+    def gen_option_value_index(self, prgopts_exh):
+        # Build index in a single pass over the options of every task.
+        # Option values are shared among tasks, so checks on them are
+        # memoized
+        option_index = OptionValueIndex()
+        value_is_abs = {}
+        opt_is_output = {}
         for process, opts_list in prgopts_exh.items():
             for task_idx in range(len(opts_list)):
                 opts = opts_list[task_idx]
-                i = 0
-                while i < len(opts):
-                    if os.path.isabs(opts[i]):
-                        if i > 0 and self.str_is_output_option(opts[i-1]):
-                            if opts[i] in process_out_values:
-                                process_out_values[opts[i]].append((process, task_idx, opts[i-1]))
-                            else:
-                                process_out_values[opts[i]] = [(process, task_idx, opts[i-1])]
-                    i += 1
-        return process_out_values
+                process_info = None
+                for i in range(len(opts)):
+                    elem = opts[i]
+                    if not self.str_is_option(elem):
+                        continue
+
+                    # Obtain option value
+                    if i+1 < len(opts) and not self.str_is_option(opts[i+1]):
+                        value = opts[i+1]
+                    else:
+                        value = None
+
+                    # Register option
+                    if process_info is None:
+                        process_info = self.get_process_taskidx_string(process, task_idx)
+                    if elem in option_index.opt_to_processes:
+                        option_index.opt_to_processes[elem].append((process_info, value))
+                    else:
+                        option_index.opt_to_processes[elem] = [(process_info, value)]
+
+                    # Register producers and consumers of value
+                    if value is None:
+                        continue
+                    if value not in value_is_abs:
+                        value_is_abs[value] = os.path.isabs(value)
+                    if not value_is_abs[value]:
+                        continue
+                    if elem not in opt_is_output:
+                        opt_is_output[elem] = self.str_is_output_option(elem)
+                    if opt_is_output[elem]:
+                        value_dict = option_index.value_producers
+                    else:
+                        value_dict = option_index.value_consumers
+                    if value in value_dict:
+                        value_dict[value].append((process, task_idx, elem))
+                    else:
+                        value_dict[value] = [(process, task_idx, elem)]
+        return option_index
 
     def get_fifos_fname(self, prefix):
         return prefix + "." + FIFOS_FEXT
@@ -495,34 +1027,88 @@ class ProcessGraph:
 
         return fifo_owners, fifo_users
 
-    def print(self):
-        # Print header
-        print("digraph G {")
-        print("overlap=false;")
+    def print(self, out_fname=None):
+        # Create writer for graph representation
+        with BufferedLineWriter(out_fname) as self.out:
+
+            # Print header
+            self.out.print("digraph G {")
+            self.out.print("overlap=false;")
 
-        print("splines=true;")
-        print("K=1;")
+            self.out.print("splines=true;")
+            self.out.print("K=1;")
 
-        # Extract information
-        process_graph_repres, process_graph_set = self.gen_process_graph_repres()
-        opt_to_processes = self.get_opt_to_processes()
-        optproc_to_arrsize = self.gen_optproc_to_arrsize(opt_to_processes)
-        opt_repres, opt_graph_set = self.gen_opt_graph_repres(opt_to_processes, optproc_to_arrsize)
-        opt_hub_repres, opt_hub_graph_set = self.gen_opt_hub_graph_repres(optproc_to_arrsize)
-        clusters = self.gen_clusters(process_graph_set, opt_graph_set, opt_hub_graph_set)
+            # Extract information
+            process_graph_repres, process_graph_set = self.gen_process_graph_repres()
+            opt_to_processes = self.get_opt_to_processes()
+            optproc_to_arrsize = self.gen_optproc_to_arrsize(opt_to_processes)
+            opt_repres, opt_graph_set = self.gen_opt_graph_repres(opt_to_processes, optproc_to_arrsize)
+            opt_hub_repres, opt_hub_graph_set = self.gen_opt_hub_graph_repres(optproc_to_arrsize)
+            clusters = self.gen_clusters(process_graph_set, opt_graph_set, opt_hub_graph_set)
 
-        # Set representation for processes and options
-        print("node [shape = " + PROCESS_NODE_SHAPE + "];", "; ".join(process_graph_repres))
-        print("node [shape = " + OPTION_NODE_SHAPE + "];", "; ".join(opt_repres))
-        print("node [shape = " + OPTION_HUB_SHAPE + "];", "; ".join(opt_hub_repres))
+            # Set representation for processes and options
+            self.out.print("node [shape = " + PROCESS_NODE_SHAPE + "];", "; ".join(process_graph_repres))
+            self.out.print("node [shape = " + OPTION_NODE_SHAPE + "];", "; ".join(opt_repres))
+            self.out.print("node [shape = " + OPTION_HUB_SHAPE + "];", "; ".join(opt_hub_repres))
 
-        # Add cluster information
-        self.print_clusters(clusters)
+            # Add cluster information
+            self.print_clusters(clusters)
 
-        # Add process graph arcs
-        self.print_proc_graph_arcs(opt_to_processes, optproc_to_arrsize)
+            # Add process graph arcs
+            self.print_proc_graph_arcs(opt_to_processes, optproc_to_arrsize)
 
-        print("}")
+            self.out.print("}")
+
+    def gen_export_records(self):
+        # Generate records for processes and the options of their tasks
+        for process, opts_list in self.prgopts_exh.items():
+            yield {"type": "process", "name": process, "num_tasks": len(opts_list)}
+            for task_idx in range(len(opts_list)):
+                opts = opts_list[task_idx]
+                for i in range(len(opts)):
+                    if not self.str_is_option(opts[i]):
+                        continue
+                    if i+1 < len(opts) and not self.str_is_option(opts[i+1]):
+                        value = opts[i+1]
+                    else:
+                        value = None
+                    yield {"type": "option",
+                           "process": process,
+                           "task": task_idx,
+                           "name": opts[i],
+                           "value": value,
+                           "output": self.str_is_output_option(opts[i])}
+
+        # Generate records for FIFOs
+        for augm_fifoname in self.fifo_owners:
+            owner, owner_taskidx = self.fifo_owners[augm_fifoname]
+            user, user_taskidx = self.fifo_users[augm_fifoname]
+            yield {"type": "fifo",
+                   "name": augm_fifoname,
+                   "owner": {"process": owner, "task": int(owner_taskidx)},
+                   "user": {"process": user, "task": int(user_taskidx)}}
+
+        # Generate records for arcs between options (the same arcs
+        # represented in the graphviz output)
+        for value, consumers in self.option_index.value_consumers.items():
+            if value not in self.process_out_values:
+                continue
+            for processname, task_idx, opt in consumers:
+                dest = {"process": processname, "task": task_idx, "option": opt}
+                process_info = self.get_process_taskidx_string(processname, task_idx)
+                if self.process_is_fifo_user(process_info, value):
+                    orig_procname, orig_taskidx = self.fifo_owners[self.get_augm_fifoname(value)]
+                    orig_process_info = self.get_process_taskidx_string(orig_procname, orig_taskidx)
+                    orig_opt = self.get_fifo_opt(orig_process_info, value)
+                    orig = {"process": orig_procname, "task": int(orig_taskidx), "option": orig_opt}
+                    yield {"type": "arc", "from": orig, "to": dest, "value": value, "fifo": True}
+                else:
+                    for orig_procname, orig_taskidx, orig_opt in self.process_out_values[value]:
+                        orig = {"process": orig_procname, "task": orig_taskidx, "option": orig_opt}
+                        yield {"type": "arc", "from": orig, "to": dest, "value": value, "fifo": False}
+
+    def export(self, export_format, out_fname=None):
+        export_records(self.gen_export_records(), export_format, out_fname)
 
     def gen_process_graph_repres(self):
         # Generate process graph representation in a list and also a set
@@ -536,22 +1122,7 @@ class ProcessGraph:
         return process_graph_repres, process_graph_set
 
     def get_opt_to_processes(self):
-        opt_to_processes = {}
-        for process, opts_list in self.prgopts_exh.items():
-            for task_idx in range(len(opts_list)):
-                opts = opts_list[task_idx]
-                for i in range(len(opts)):
-                    elem = opts[i]
-                    if i+1 < len(opts) and not self.str_is_option(opts[i+1]):
-                        value = opts[i+1]
-                    else:
-                        value = None
-                    if self.str_is_option(elem):
-                        if elem in opt_to_processes:
-                            opt_to_processes[elem].append((self.get_process_taskidx_string(process, task_idx), value))
-                        else:
-                            opt_to_processes[elem] = [(self.get_process_taskidx_string(process, task_idx), value)]
-        return opt_to_processes
+        return self.option_index.opt_to_processes
 
     def str_is_option(self, string):
         if not string:
@@ -573,7 +1144,7 @@ class ProcessGraph:
         return processname + PROCESS_TASKIDX_SEP + str(task_idx)
 
     def get_process_taskidx_elems(self, process_info):
-        return re.split(re.escape(PROCESS_TASKIDX_SEP), process_info)
+        return process_info.split(PROCESS_TASKIDX_SEP)
 
     def gen_optproc_to_arrsize(self, opt_to_processes):
         optproc_to_arrsize = {}
@@ -689,13 +1260,13 @@ class ProcessGraph:
 
     def print_clusters(self, clusters):
         for proc_graph in clusters:
-            print("subgraph", "cluster_" + proc_graph, "{")
-            print("style=" + CLUSTER_STYLE + ";")
-            print("color=" + CLUSTER_FILL_COLOR + ";")
-            print(proc_graph + ";")
+            self.out.print("subgraph", "cluster_" + proc_graph, "{")
+            self.out.print("style=" + CLUSTER_STYLE + ";")
+            self.out.print("color=" + CLUSTER_FILL_COLOR + ";")
+            self.out.print(proc_graph + ";")
             for elem in clusters[proc_graph]:
-                print('"' + elem + '"' + ";")
-            print("}")
+                self.out.print('"' + elem + '"' + ";")
+            self.out.print("}")
 
     def print_proc_graph_arcs(self, opt_to_processes, optproc_to_arrsize):
         # Iterate over options
@@ -727,13 +1298,13 @@ class ProcessGraph:
         # Print arc
         if self.str_is_output_option(opt):
             if self.process_is_fifo_owner(process_info, opt_val):
-                print(processname, "->", '"'+ opt_graph +'"', "[ style=" + FIFO_ARC_STYLE + " ] ;")
+                self.out.print(processname, "->", '"'+ opt_graph +'"', "[ style=" + FIFO_ARC_STYLE + " ] ;")
             else:
-                print(processname, "->", '"'+ opt_graph +'"', ";")
+                self.out.print(processname, "->", '"'+ opt_graph +'"', ";")
         elif self.process_is_fifo_user(process_info, opt_val) or self.process_is_fifo_owner(process_info, opt_val):
-            print('"'+ opt_graph +'"', "->", processname, "[ style=" + FIFO_ARC_STYLE + " ] ;")
+            self.out.print('"'+ opt_graph +'"', "->", processname, "[ style=" + FIFO_ARC_STYLE + " ] ;")
         else:
-            print('"'+ opt_graph +'"', "->", processname, ";")
+            self.out.print('"'+ opt_graph +'"', "->", processname, ";")
 
     def print_opt_to_proc_args_arr(self, process_info, opt, opt_val):
         # Initialize variables
@@ -749,20 +1320,20 @@ class ProcessGraph:
         if self.str_is_output_option(opt):
             if self.process_is_fifo_owner(process_info, opt_val):
                 if task_idx == 0:
-                    print(processname, "->", '"'+ opt_hub +'"', "[ style=" + FIFO_ARC_STYLE + " ] ;")
-                print('"'+ opt_hub +'"', "->", '"'+ opt_graph +'"', "[ style=" + FIFO_ARC_STYLE + " ] ;")
+                    self.out.print(processname, "->", '"'+ opt_hub +'"', "[ style=" + FIFO_ARC_STYLE + " ] ;")
+                self.out.print('"'+ opt_hub +'"', "->", '"'+ opt_graph +'"', "[ style=" + FIFO_ARC_STYLE + " ] ;")
             else:
                 if task_idx == 0:
-                    print(processname, "->", '"'+ opt_hub +'"', ";")
-                print('"'+ opt_hub +'"', "->", '"'+ opt_graph +'"', ";")
+                    self.out.print(processname, "->", '"'+ opt_hub +'"', ";")
+                self.out.print('"'+ opt_hub +'"', "->", '"'+ opt_graph +'"', ";")
         elif self.process_is_fifo_user(process_info, opt_val) or self.process_is_fifo_owner(process_info, opt_val):
-            print('"'+ opt_graph +'"', "->", '"'+ opt_hub +'"', "[ style=" + FIFO_ARC_STYLE + " ] ;")
+            self.out.print('"'+ opt_graph +'"', "->", '"'+ opt_hub +'"', "[ style=" + FIFO_ARC_STYLE + " ] ;")
             if task_idx == 0:
-                print('"'+ opt_hub +'"', "->", processname, "[ style=" + FIFO_ARC_STYLE + " ] ;")
+                self.out.print('"'+ opt_hub +'"', "->", processname, "[ style=" + FIFO_ARC_STYLE + " ] ;")
         else:
-            print('"'+ opt_graph +'"', "->", '"'+ opt_hub +'"', ";")
+            self.out.print('"'+ opt_graph +'"', "->", '"'+ opt_hub +'"', ";")
             if task_idx == 0:
-                print('"'+ opt_hub +'"', "->", processname, ";")
+                self.out.print('"'+ opt_hub +'"', "->", processname, ";")
 
     def get_augm_fifoname(self, abs_fifoname):
         basename = os.path.basename(abs_fifoname)
@@ -802,8 +1373,9 @@ class ProcessGraph:
         # Get option value
         opt_val = opt_procs[1]
 
-        # Print arcs if required
-        if not self.str_is_output_option(opt) and os.path.isabs(opt_val):
+        # Print arcs if required (values in process_out_values are
+        # absolute paths)
+        if not self.str_is_output_option(opt):
             if opt_val in self.process_out_values:
                 if self.process_is_fifo_user(process_info, opt_val):
                     self.print_opt_to_opt_fifo(process_info, opt, opt_val)
@@ -823,7 +1395,7 @@ class ProcessGraph:
         dest_opt_graph = self.get_opt_graph(dest_opt, dest_process_info)
 
         # Print arc
-        print('"'+ orig_opt_graph +'"', "->", '"' + dest_opt_graph + '"', "[ style=" + FIFO_ARC_STYLE + " ] ;")
+        self.out.print('"'+ orig_opt_graph +'"', "->", '"' + dest_opt_graph + '"', "[ style=" + FIFO_ARC_STYLE + " ] ;")
 
     def get_fifo_opt(self, process_info, abs_fifoname):
         # Obtain necessary process information
@@ -856,4 +1428,150 @@ class ProcessGraph:
             dest_opt_graph = self.get_opt_graph(opt, process_info)
 
             # Print arc
-            print('"'+ orig_opt_graph +'"', "->", '"' + dest_opt_graph + '"', ";")
+            self.out.print('"'+ orig_opt_graph +'"', "->", '"' + dest_opt_graph + '"', ";")
+
+    def print_compressed(self, expanded_processes=(), out_fname=None):
+        # Print process graph collapsing ranges of consecutive tasks of
+        # array processes whose options only differ in the task index
+        # into single nodes (e.g. "-inf[0..49999]"), so the size of the
+        # output does not depend on the number of tasks. Tasks of the
+        # processes given in expanded_processes are represented
+        # individually
+        task_ranges = self.gen_task_ranges(expanded_processes)
+        range_opts, arcs = self.gen_compressed_graph_elems(task_ranges)
+
+        # Create writer for graph representation
+        with BufferedLineWriter(out_fname) as self.out:
+
+            # Print header
+            self.out.print("digraph G {")
+            self.out.print("overlap=false;")
+
+            self.out.print("splines=true;")
+            self.out.print("K=1;")
+
+            # Set representation for processes and options
+            self.out.print("node [shape = " + PROCESS_NODE_SHAPE + "];", "; ".join(self.prgopts_exh))
+            opt_repres = []
+            for opt_graph, label in range_opts.values():
+                opt_repres.append('{node [label="' + label + '"] "' + opt_graph + '"; }')
+            self.out.print("node [shape = " + OPTION_NODE_SHAPE + "];", "; ".join(opt_repres))
+
+            # Add cluster information
+            clusters = {}
+            for process in self.prgopts_exh:
+                clusters[process] = []
+            for (opt, process, range_idx), (opt_graph, label) in range_opts.items():
+                clusters[process].append(opt_graph)
+            self.print_clusters(clusters)
+
+            # Add process graph arcs
+            for (orig, dest), fifo in arcs.items():
+                if fifo:
+                    self.out.print(orig, "->", dest, "[ style=" + FIFO_ARC_STYLE + " ] ;")
+                else:
+                    self.out.print(orig, "->", dest, ";")
+
+            self.out.print("}")
+
+    def gen_task_ranges(self, expanded_processes):
+        # Obtain, for each process, the list of task ranges (as
+        # (start, end) tuples) and the range index of each task
+        task_ranges = {}
+        for process, opts_list in self.prgopts_exh.items():
+            ranges = []
+            task_to_range = []
+            prev_opts_pattern = None
+            for task_idx in range(len(opts_list)):
+                opts_pattern = self.get_task_opts_pattern(opts_list[task_idx], task_idx)
+                if process in expanded_processes or opts_pattern != prev_opts_pattern:
+                    ranges.append((task_idx, task_idx))
+                    prev_opts_pattern = opts_pattern
+                else:
+                    ranges[-1] = (ranges[-1][0], task_idx)
+                task_to_range.append(len(ranges) - 1)
+            task_ranges[process] = ranges, task_to_range
+        return task_ranges
+
+    def get_task_opts_pattern(self, opts, task_idx):
+        # Return options of task replacing the numbers equal to the task
+        # index in option values by a placeholder, so tasks whose
+        # options only differ in the task index share the same pattern
+        task_idx_str = str(task_idx)
+        pattern = []
+        for elem in opts:
+            if self.str_is_option(elem) or task_idx_str not in elem:
+                pattern.append(elem)
+            else:
+                pattern.append(TASK_IDX_NUMBER_RE.sub(lambda m: "{}" if m.group() == task_idx_str else m.group(), elem))
+        return tuple(pattern)
+
+    def get_task_range_string(self, task_range):
+        if task_range[0] == task_range[1]:
+            return str(task_range[0])
+        else:
+            return str(task_range[0]) + ".." + str(task_range[1])
+
+    def get_range_opt_graph(self, task_ranges, opt, process, task_idx, range_opts):
+        # Return graph node for option of the range containing the given
+        # task, registering it if necessary
+        ranges, task_to_range = task_ranges[process]
+        range_idx = task_to_range[task_idx]
+        key = (opt, process, range_idx)
+        if key not in range_opts:
+            range_string = self.get_task_range_string(ranges[range_idx])
+            opt_graph = self.get_opt_graph(opt, self.get_process_taskidx_string(process, range_string))
+            if len(task_to_range) == 1:
+                label = opt
+            elif ranges[range_idx][0] == ranges[range_idx][1]:
+                label = opt + range_string
+            else:
+                label = opt + "[" + range_string + "]"
+            range_opts[key] = opt_graph, label
+        return '"' + range_opts[key][0] + '"'
+
+    def gen_compressed_graph_elems(self, task_ranges):
+        # Generate option nodes and arcs. Arcs are stored in a dictionary
+        # to remove duplicates while keeping their order, an arc is
+        # represented as a FIFO arc if any of the task arcs collapsed
+        # into it is a FIFO arc
+        range_opts = {}
+        arcs = {}
+        for opt, opt_procs in self.option_index.opt_to_processes.items():
+            is_output_opt = self.str_is_output_option(opt)
+            for process_info, opt_val in opt_procs:
+                process_info_elems = self.get_process_taskidx_elems(process_info)
+                processname = process_info_elems[0]
+                task_idx = int(process_info_elems[1])
+                opt_graph = self.get_range_opt_graph(task_ranges, opt, processname, task_idx, range_opts)
+
+                # Add arc between option and process
+                if opt_val is None:
+                    fifo = False
+                elif is_output_opt:
+                    fifo = self.process_is_fifo_owner(process_info, opt_val)
+                else:
+                    fifo = self.process_is_fifo_user(process_info, opt_val) or self.process_is_fifo_owner(process_info, opt_val)
+                if is_output_opt:
+                    arc = (processname, opt_graph)
+                else:
+                    arc = (opt_graph, processname)
+                arcs[arc] = arcs.get(arc, False) or fifo
+
+                # Add arcs between options
+                if is_output_opt or opt_val not in self.process_out_values:
+                    continue
+                if self.process_is_fifo_user(process_info, opt_val):
+                    base_fname = self.get_augm_fifoname(opt_val)
+                    orig_procname, orig_taskidx = self.fifo_owners[base_fname]
+                    orig_process_info = self.get_process_taskidx_string(orig_procname, orig_taskidx)
+                    orig_opt = self.get_fifo_opt(orig_process_info, opt_val)
+                    if orig_opt is not None:
+                        orig_opt_graph = self.get_range_opt_graph(task_ranges, orig_opt, orig_procname, int(orig_taskidx), range_opts)
+                        arcs[(orig_opt_graph, opt_graph)] = True
+                else:
+                    for orig_procname, orig_taskidx, orig_opt in self.process_out_values[opt_val]:
+                        orig_opt_graph = self.get_range_opt_graph(task_ranges, orig_opt, orig_procname, orig_taskidx, range_opts)
+                        arc = (orig_opt_graph, opt_graph)
+                        arcs[arc] = arcs.get(arc, False)
+        return range_opts, arcs
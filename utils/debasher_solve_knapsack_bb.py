@@ -23,7 +23,13 @@ import io
 import sys
 import getopt
 import operator
-from ortools.algorithms import pywrapknapsack_solver
+import time
+from debasher_knapsack_exact import knapsack_solve_exact
+
+try:
+    from ortools.algorithms import pywrapknapsack_solver
+except ImportError:
+    pywrapknapsack_solver = None
 
 ##################################################
 
@@ -69,6 +75,9 @@ def check_pars(flags, values):
         print("Error! -c parameter not given", file=sys.stderr)
         sys.exit(2)
 
+    if pywrapknapsack_solver is None:
+        print("Note: ortools module not available, using pure Python branch and bound solver", file=sys.stderr)
+
 ##################################################
 
 
@@ -118,7 +127,37 @@ def get_capacities(capacities):
 ##################################################
 
 
+def solve_without_ortools(items, weights, values, capacities, tlimit):
+    deadline = None
+    if tlimit > 0:
+        deadline = time.time() + tlimit
+    ancestors = [0] * len(items)
+    computed_value, packed_items, optimal = knapsack_solve_exact(
+        weights, values, capacities, ancestors, deadline=deadline)
+    return computed_value, packed_items
+
+##################################################
+
+
 def solve(items, weights, values, capacities, tlimit):
+    if pywrapknapsack_solver is None:
+        computed_value, packed_items = solve_without_ortools(items, weights, values, capacities, tlimit)
+    else:
+        computed_value, packed_items = solve_with_ortools(items, weights, values, capacities, tlimit)
+
+    packed_weights = []
+    for i in range(len(weights)):
+        packed_weights.append(0)
+    for i in packed_items:
+        for j in range(len(weights)):
+            packed_weights[j] += weights[j][i]
+
+    return computed_value, packed_items, packed_weights
+
+##################################################
+
+
+def solve_with_ortools(items, weights, values, capacities, tlimit):
     # Create solver
     solver = pywrapknapsack_solver.KnapsackSolver(
         pywrapknapsack_solver.KnapsackSolver.KNAPSACK_MULTIDIMENSION_BRANCH_AND_BOUND_SOLVER, 'problem')
@@ -136,14 +175,8 @@ def solve(items, weights, values, capacities, tlimit):
     # Collect solution data
     packed_items = [x for x in range(0, len(weights[0]))
                     if solver.BestSolutionContains(x)]
-    packed_weights = []
-    for i in range(len(weights)):
-        packed_weights.append(0)
-    for i in packed_items:
-        for j in range(len(weights)):
-            packed_weights[j] += weights[j][i]
 
-    return computed_value, packed_items, packed_weights
+    return computed_value, packed_items
 
 ##################################################
 
@@ -23,7 +23,8 @@ import io
 import sys
 import getopt
 import operator
-from debasher_knapsack_ga import knapsack_solve
+from debasher_knapsack_ga import knapsack_solve, knapsack_solve_numpy, numpy
+from debasher_knapsack_deps import extract_deps_info, compute_ancestors
 
 ##################################################
 def take_pars():
@@ -31,15 +32,18 @@ def take_pars():
     values = {}
     flags["s_given"] = False
     flags["c_given"] = False
+    flags["d_given"] = False
     flags["g_given"] = False
     values["maxgen"] = 1000
     flags["p_given"] = False
     values["popsize"] = 100
     flags["t_given"] = False
     values["time"] = -1
+    flags["e_given"] = False
+    values["engine"] = "python"
 
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "s:c:g:p:t:", ["spec=", "capacities=", "maxgen=", "popsize=", "time="])
+        opts, args = getopt.getopt(sys.argv[1:], "s:c:d:g:p:t:e:", ["spec=", "capacities=", "deps=", "maxgen=", "popsize=", "time=", "engine="])
     except getopt.GetoptError:
         print_help()
         sys.exit(2)
@@ -54,6 +58,9 @@ def take_pars():
             elif opt in ("-c", "--capacities"):
                 values["capacities"] = arg
                 flags["c_given"] = True
+            elif opt in ("-d", "--deps"):
+                values["deps"] = arg
+                flags["d_given"] = True
             elif opt in ("-g", "--maxgen"):
                 values["maxgen"] = int(arg)
                 flags["g_given"] = True
@@ -63,6 +70,9 @@ def take_pars():
             elif opt in ("-t", "--time"):
                 values["time"] = float(arg)
                 flags["t_given"] = True
+            elif opt in ("-e", "--engine"):
+                values["engine"] = arg
+                flags["e_given"] = True
     return (flags, values)
 
 ##################################################
@@ -75,15 +85,33 @@ def check_pars(flags, values):
         print("Error! -c parameter not given", file=sys.stderr)
         sys.exit(2)
 
+    if values["engine"] not in ("python", "numpy"):
+        print("Error! -e parameter should be python or numpy", file=sys.stderr)
+        sys.exit(2)
+
+    # Dependencies are only supported by the numpy engine
+    if flags["d_given"]:
+        if flags["e_given"] and values["engine"] != "numpy":
+            print("Error! -d parameter requires numpy engine", file=sys.stderr)
+            sys.exit(2)
+        values["engine"] = "numpy"
+
+    if(values["engine"] == "numpy" and numpy is None):
+        print("Error! numpy engine requires numpy module", file=sys.stderr)
+        sys.exit(2)
+
 ##################################################
 def print_help():
-    print("debasher_solve_knapsack_ga -s <string> -c <string> [-g <int>] [-p <int>] [-t <float>]", file=sys.stderr)
+    print("debasher_solve_knapsack_ga -s <string> -c <string> [-d <string>] [-g <int>] [-p <int>] [-t <float>]", file=sys.stderr)
+    print("                           [-e <string>]", file=sys.stderr)
     print("", file=sys.stderr)
     print("-s <string>    Item weight and value specification", file=sys.stderr)
     print("-c <string>    Comma-separated list of capacities", file=sys.stderr)
+    print("-d <string>    Predecessors specification (optional, implies -e numpy)", file=sys.stderr)
     print("-g <int>       Number of generations (1000 by default)", file=sys.stderr)
     print("-p <int>       Population size (100 by default)", file=sys.stderr)
     print("-t <float>     Time limit to produce a solution in seconds (no limit by default)", file=sys.stderr)
+    print("-e <string>    Genetic algorithm engine, python or numpy (python by default)", file=sys.stderr)
 
 ##################################################
 def extract_spec_info(specfile):
@@ -118,10 +146,15 @@ def get_capacities(capacities):
     return clist
 
 ##################################################
-def solve(max_gen, pop_size, items, weights, values, capacities, time_limit):
+def solve(max_gen, pop_size, items, weights, values, capacities, time_limit, ancestors=None,
+          engine="python"):
     start_pop_with_zeroes = False
-    computed_value, packed_items = knapsack_solve(
-        max_gen, pop_size, start_pop_with_zeroes, weights, values, capacities, time_limit)
+    if engine == "python":
+        computed_value, packed_items = knapsack_solve(
+            max_gen, pop_size, start_pop_with_zeroes, weights, values, capacities, time_limit)
+    else:
+        computed_value, packed_items = knapsack_solve_numpy(
+            max_gen, pop_size, start_pop_with_zeroes, weights, values, capacities, ancestors, time_limit)
     packed_weights = []
     for i in range(len(weights)):
         packed_weights.append(0)
@@ -141,8 +174,12 @@ def print_solution(items, computed_value, packed_items, packed_weights):
 def process_pars(flags, values):
     items, weights, vals = extract_spec_info(values["spec"])
     capacities = get_capacities(values["capacities"])
+    ancestors = None
+    if flags["d_given"]:
+        ancestors = compute_ancestors(items, extract_deps_info(values["deps"], items))
     computed_value, packed_items, packed_weights = solve(
-        values["maxgen"], values["popsize"], items, weights, vals, capacities, values["time"])
+        values["maxgen"], values["popsize"], items, weights, vals, capacities, values["time"], ancestors,
+        values["engine"])
     print_solution(items, computed_value, packed_items, packed_weights)
 
 ##################################################
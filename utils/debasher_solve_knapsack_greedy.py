@@ -73,6 +73,83 @@ and the best solution found across all restarts is kept. -t/--time
 <float> is an optional time cap in seconds: if given, the restarts
 loop stops as soon as the cap is reached even if fewer than
 <restarts> iterations have completed.
+
+Passing -l/--local-search enables a local search phase that tries
+to improve the best greedy solution. Each move drops a selected
+process together with the selected processes depending on it (so
+the predecessor closure, including the processes connected in both
+directions, is respected) and refills the freed capacity with
+unselected processes and their missing predecessors, in priority
+order. Moves are only accepted if they increase the total value,
+and the search stops when a pass over the selected processes does
+not improve the solution, after 8 passes, or when the -t time cap
+(which also covers the restarts) is reached. Each pass costs O(n)
+bundle checks per selected process, so giving -t is recommended for
+large problems. -l is also honoured in server mode (-f), although
+the builtin scheduler does not pass it.
+
+Passing -x/--exact-max-items <int> solves the problem exactly when
+the number of processes does not exceed <int>. The exact solver
+(implemented in pure Python, see debasher_knapsack_exact.py) performs
+a depth-first branch and bound search starting from the solution
+obtained with the options above. Packing a process also packs its
+predecessors, and discarding it also discards the processes depending
+on it, and nodes are pruned using the fractional relaxation of each
+resource. The search is exponential in the worst case, so it is only
+intended for small candidate sets; if the -t time cap is reached, the
+best solution found so far is returned. The builtin scheduler passes
+this option, so small problems are solved exactly.
+
+Passing -e numpy selects a NumPy-based implementation of the greedy
+pass (priorities, bundle usage and feasibility checks are computed
+over arrays), which yields the same solutions as the default pure
+Python implementation (-e python). If NumPy is not installed, the
+pure Python implementation is used instead.
+
+Restarts can be distributed among several worker processes with
+-j/--jobs <int>. Each restart uses its own random generator, whose
+seed is derived from the one given with -g/--seed <int>, so for a
+given seed the solution only depends on the number of restarts
+completed (not on the number of workers). The -t time cap applies to
+all workers.
+
+Passing -p/--prev-sol <string> warm-starts the solver from a
+previous solution (a file containing a "Packed items:" line, as
+written by this solver). Previously packed processes that are still
+candidates are kept together with their predecessors; if they exceed
+the capacities, the least attractive ones (and the processes
+depending on them) are dropped, and then the solution is extended
+with the remaining processes as in the greedy pass. -m/--max-dropped
+<int> bounds the number of previously packed processes that can be
+dropped; if more should be dropped, the problem is solved from
+scratch.
+
+Passing -f <string> runs the solver as a server that keeps the
+problem in memory between solutions, which avoids parsing the
+problem and computing the predecessor closure from scratch each time.
+Requests are read, one per line, from the FIFO <string>.req and
+solutions are written to the FIFO <string>.sol (both FIFOs are
+created if they do not exist). Accepted requests are:
+
+    ITEM process_id value weight1 ... weightN   (add or update process)
+    DEL process_id                              (remove process)
+    DEP successor_id predecessor_id             (add predecessor)
+    UNDEP successor_id predecessor_id           (remove predecessor)
+    CAP capacity1,...,capacityN                 (set capacities)
+    SOLVE                                       (write solution)
+    EXIT                                        (stop server)
+
+Predecessors are kept when processes are removed, so dependencies on
+processes that are no longer candidates are considered satisfied, as
+in the non-server mode. Solutions are written with the same format
+used in the non-server mode.
+
+In server mode, -w/--warm-start warm-starts each solution from the
+previous one, as done with -p in the non-server mode (processes of
+the previous solution that are no longer candidates are ignored, and
+-m can also be given). Together with the predecessor closure kept in
+memory, this avoids recomputing the solution from scratch when only
+capacities or a few processes change between requests.
 """
 
 # *- python -*
@@ -81,6 +158,25 @@ import sys
 import getopt
 import time
 import random
+import bisect
+import os
+from debasher_knapsack_deps import extract_deps_info, compute_ancestors, update_ancestors, get_items_from_bitmask
+from debasher_knapsack_exact import knapsack_solve_exact
+
+# numpy is only imported when the numpy engine is selected (see
+# import_numpy), since importing it takes longer than solving small
+# problems
+numpy = None
+
+# Constants
+GREEDY_NUMPY_BLOCK_SIZE = 256
+RESTART_CHUNKS_PER_WORKER = 4
+KNAPSACK_SERVER_REQ_FIFO_FEXT = "req"
+KNAPSACK_SERVER_SOL_FIFO_FEXT = "sol"
+LOCAL_SEARCH_MAX_PASSES = 8
+
+# Data shared by the restarts executed in a worker process
+restart_worker_data = None
 
 ##################################################
 def take_pars():
@@ -95,11 +191,26 @@ def take_pars():
     values["time"] = -1
     flags["n_given"] = False
     values["noise"] = 0.25
+    flags["e_given"] = False
+    values["engine"] = "python"
+    flags["j_given"] = False
+    values["jobs"] = 1
+    flags["g_given"] = False
+    values["seed"] = None
+    flags["f_given"] = False
+    flags["p_given"] = False
+    flags["m_given"] = False
+    values["max_dropped"] = -1
+    flags["l_given"] = False
+    flags["w_given"] = False
+    flags["x_given"] = False
+    values["exact_max_items"] = 0
 
     try:
         opts, args = getopt.getopt(
-            sys.argv[1:], "s:c:d:r:t:n:",
-            ["spec=", "capacities=", "deps=", "restarts=", "time=", "noise="])
+            sys.argv[1:], "s:c:d:r:t:n:e:j:g:f:p:m:lwx:",
+            ["spec=", "capacities=", "deps=", "restarts=", "time=", "noise=", "engine=", "jobs=", "seed=", "fifos=",
+             "prev-sol=", "max-dropped=", "local-search", "warm-start", "exact-max-items="])
     except getopt.GetoptError:
         print_help()
         sys.exit(2)
@@ -126,33 +237,120 @@ def take_pars():
             elif opt in ("-n", "--noise"):
                 values["noise"] = float(arg)
                 flags["n_given"] = True
+            elif opt in ("-e", "--engine"):
+                values["engine"] = arg
+                flags["e_given"] = True
+            elif opt in ("-j", "--jobs"):
+                values["jobs"] = int(arg)
+                flags["j_given"] = True
+            elif opt in ("-g", "--seed"):
+                values["seed"] = int(arg)
+                flags["g_given"] = True
+            elif opt in ("-f", "--fifos"):
+                values["fifos"] = arg
+                flags["f_given"] = True
+            elif opt in ("-p", "--prev-sol"):
+                values["prev_sol"] = arg
+                flags["p_given"] = True
+            elif opt in ("-m", "--max-dropped"):
+                values["max_dropped"] = int(arg)
+                flags["m_given"] = True
+            elif opt in ("-l", "--local-search"):
+                flags["l_given"] = True
+            elif opt in ("-w", "--warm-start"):
+                flags["w_given"] = True
+            elif opt in ("-x", "--exact-max-items"):
+                values["exact_max_items"] = int(arg)
+                flags["x_given"] = True
     return (flags, values)
 
 ##################################################
 def check_pars(flags, values):
-    if(flags["s_given"] == False):
-        print("Error! -s parameter not given", file=sys.stderr)
+    if(flags["f_given"]):
+        if(flags["s_given"] or flags["c_given"] or flags["d_given"] or flags["p_given"]):
+            print("Error! -f parameter cannot be given together with -s, -c, -d or -p", file=sys.stderr)
+            sys.exit(2)
+    else:
+        if(flags["s_given"] == False):
+            print("Error! -s parameter not given", file=sys.stderr)
+            sys.exit(2)
+
+        if(flags["c_given"] == False):
+            print("Error! -c parameter not given", file=sys.stderr)
+            sys.exit(2)
+
+    if values["engine"] not in ("python", "numpy"):
+        print("Error! -e parameter should be python or numpy", file=sys.stderr)
+        sys.exit(2)
+
+    if(flags["w_given"] and not flags["f_given"]):
+        print("Error! -w parameter requires -f parameter", file=sys.stderr)
         sys.exit(2)
 
-    if(flags["c_given"] == False):
-        print("Error! -c parameter not given", file=sys.stderr)
+    if(flags["m_given"] and not (flags["p_given"] or flags["w_given"])):
+        print("Error! -m parameter requires -p or -w parameter", file=sys.stderr)
         sys.exit(2)
 
+    if values["exact_max_items"] < 0:
+        print("Error! -x parameter should not be negative", file=sys.stderr)
+        sys.exit(2)
+
+    if values["jobs"] < 1:
+        print("Error! -j parameter should be greater than zero", file=sys.stderr)
+        sys.exit(2)
+
+    if values["engine"] == "numpy" and not import_numpy():
+        print("Note: numpy module not available, using python engine", file=sys.stderr)
+        values["engine"] = "python"
+
+##################################################
+def import_numpy():
+    # Import numpy if not done yet, returning False if it is not
+    # available
+    global numpy
+    if numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+    return True
+
 ##################################################
 def print_help():
-    print("debasher_solve_knapsack_greedy -s <string> -c <string> [-d <string>] [-r <int>] [-t <float>] [-n <float>]", file=sys.stderr)
+    print("debasher_solve_knapsack_greedy {-s <string> -c <string> [-d <string>] [-p <string> [-m <int>]] | -f <string> [-w [-m <int>]]}", file=sys.stderr)
+    print("                               [-r <int>] [-t <float>] [-n <float>] [-l] [-x <int>] [-e <string>] [-j <int>]", file=sys.stderr)
+    print("                               [-g <int>]", file=sys.stderr)
     print("", file=sys.stderr)
     print("-s <string>    Item weight/value specification", file=sys.stderr)
     print("-c <string>    Comma-separated list of capacities", file=sys.stderr)
     print("-d <string>    Predecessors specification (optional)", file=sys.stderr)
+    print("-p <string>    Previous solution used to warm-start the solver (optional)", file=sys.stderr)
+    print("-m <int>       Maximum number of processes of the previous solution that", file=sys.stderr)
+    print("                can be dropped, otherwise the problem is solved from", file=sys.stderr)
+    print("                scratch (no limit by default, only used with -p or -w)", file=sys.stderr)
+    print("-f <string>    Run as server reading requests from FIFO <string>.req and", file=sys.stderr)
+    print("                writing solutions to FIFO <string>.sol", file=sys.stderr)
+    print("-w             Warm-start each solution from the previous one (only", file=sys.stderr)
+    print("                used with -f)", file=sys.stderr)
     print("-r <int>       Number of randomized greedy restarts (optional, 0 by", file=sys.stderr)
     print("                default = single deterministic pass, no randomization)", file=sys.stderr)
     print("-t <float>     Optional time cap in seconds; stops before completing all", file=sys.stderr)
-    print("                restarts if exceeded (no cap by default, only used when", file=sys.stderr)
-    print("                -r > 0)", file=sys.stderr)
+    print("                restarts, the local search or the exact solver if", file=sys.stderr)
+    print("                exceeded (no cap by default, only used when -r > 0, -l", file=sys.stderr)
+    print("                or -x are given)", file=sys.stderr)
     print("-n <float>     Noise level for randomized restarts, e.g. 0.25 means +-25%", file=sys.stderr)
     print("                jitter on the priority ratio (0.25 by default, only used", file=sys.stderr)
     print("                when -r > 0)", file=sys.stderr)
+    print("-l             Improve greedy solution by means of local search", file=sys.stderr)
+    print("-x <int>       Solve problem exactly by means of branch and bound if the", file=sys.stderr)
+    print("                number of processes does not exceed <int> (0 by default =", file=sys.stderr)
+    print("                never; the -t time cap also applies)", file=sys.stderr)
+    print("-e <string>    Engine used to compute greedy solutions, python or numpy", file=sys.stderr)
+    print("                (python by default, both obtain the same solutions)", file=sys.stderr)
+    print("-j <int>       Number of worker processes executing the restarts (1 by", file=sys.stderr)
+    print("                default, only used when -r > 0)", file=sys.stderr)
+    print("-g <int>       Seed for randomized restarts, making results reproducible", file=sys.stderr)
+    print("                (random by default, only used when -r > 0)", file=sys.stderr)
 
 ##################################################
 def get_capacities(capacities):
@@ -185,103 +383,92 @@ def extract_spec_info(specfile, num_capacities):
     return items, weights, values
 
 ##################################################
-def extract_deps_info(depsfile, items):
-    # Every process starts with an empty predecessor list; entries
-    # in the deps file add to it. One "successor predecessor" pair
-    # per line.
-    #
-    # A predecessor that is NOT among the current candidate
-    # processes is assumed to have already run in a previous stage
-    # (e.g. a pipelined execution where completed processes are no
-    # longer passed to the solver). In that case the dependency is
-    # already satisfied and imposes no further constraint here.
-    #
-    # A successor that is NOT among the current candidate processes
-    # simply has nothing to constrain in this run, so the edge is
-    # skipped too.
-    preds_by_name = {name: [] for name in items}
-    item_set = set(items)
+def extract_prev_sol_info(prev_sol_file, items):
+    # Return indices of the processes packed in a previous solution
+    # that are still among the current candidate processes
+    index_of = {name: i for i, name in enumerate(items)}
+    prev_packed_items = []
 
-    file = open(depsfile, 'r')
-    for entry in file:
-        entry = entry.strip()
-        if not entry:
-            continue
-        fields = entry.split()
-        successor, predecessor = fields[0], fields[1]
+    try:
+        file = open(prev_sol_file, 'r')
+    except OSError:
+        print("Note: previous solution file", prev_sol_file, "could not be read, solving from scratch", file=sys.stderr)
+        return None
 
-        if successor not in item_set:
-            print("Note: successor '%s' not found among current processes, "
-                  "ignoring dependency on '%s'" % (successor, predecessor),
-                  file=sys.stderr)
-            continue
+    for entry in file:
+        if entry.startswith("Packed items:"):
+            for name in entry[len("Packed items:"):].split():
+                if name in index_of:
+                    prev_packed_items.append(index_of[name])
+    file.close()
 
-        if predecessor not in item_set:
-            print("Note: predecessor '%s' of '%s' not found among current "
-                  "processes, assuming it already ran" % (predecessor, successor),
-                  file=sys.stderr)
-            continue
+    return prev_packed_items
 
-        preds_by_name[successor].append(predecessor)
-    file.close()
+##################################################
+def get_weight_score(weights, capacities, i):
+    s = 0.0
+    for r in range(len(capacities)):
+        if capacities[r] > 0:
+            s += weights[r][i] / capacities[r]
+    return s if s > 0 else 1e-9
 
-    return preds_by_name
+##################################################
+def get_usage(weights, item_list):
+    usage = [0] * len(weights)
+    for j in item_list:
+        for r in range(len(weights)):
+            usage[r] += weights[r][j]
+    return usage
 
 ##################################################
-def compute_ancestors(items, preds_by_name):
-    # Precompute, for each process, the full set of transitive
-    # predecessors required, directly or indirectly.
-    #
-    # A cycle in this graph (e.g. A requires B and B requires A) is
-    # not an error: it simply means all processes in the cycle must
-    # always be selected together. The traversal below terminates
-    # correctly in that case too, since the shared `visited` set
-    # prevents infinite recursion. An informational note is printed
-    # so unintended cycles (typos) don't pass unnoticed.
-    index_of = {name: i for i, name in enumerate(items)}
-    direct_preds = []
-    for name in items:
-        direct_preds.append([index_of[p] for p in preds_by_name.get(name, [])])
-
-    ancestors = [None] * len(items)
-    warned_pairs = set()
-
-    def dfs(i, visited, stack):
-        stack.add(i)
-        for p in direct_preds[i]:
-            if p in stack:
-                pair = frozenset((i, p))
-                if pair not in warned_pairs:
-                    warned_pairs.add(pair)
-                    print("Note: '%s' and '%s' form a dependency cycle, they "
-                          "will always be selected together" % (items[i], items[p]),
-                          file=sys.stderr)
-            if p not in visited:
-                visited.add(p)
-                dfs(p, visited, stack)
-        stack.discard(i)
-
-    for i in range(len(items)):
-        visited = set()
-        dfs(i, visited, set())
-        ancestors[i] = visited
-
-    return ancestors
+def repair_solution(weights, values, capacities, ancestors, prev_packed_items,
+                    max_dropped=-1):
+    # Obtain initial selection for the greedy pass from a previous
+    # solution. Return None if more than max_dropped previously packed
+    # processes should be dropped (max_dropped < 0 means no limit)
+    num_res = len(capacities)
+
+    # Keep previously packed processes together with their predecessors
+    selected = 0
+    for i in prev_packed_items:
+        selected |= ancestors[i] | (1 << i)
+    used = get_usage(weights, get_items_from_bitmask(selected))
+
+    # Drop least attractive processes, as well as the selected
+    # processes depending on them, until capacities are respected
+    prev_packed_set = set(prev_packed_items)
+    num_dropped = 0
+    removal_order = sorted(get_items_from_bitmask(selected),
+                           key=lambda i: values[i] / get_weight_score(weights, capacities, i))
+    for i in removal_order:
+        if all(used[r] <= capacities[r] for r in range(num_res)):
+            break
+        bit = 1 << i
+        if not selected & bit:
+            continue
+        for j in get_items_from_bitmask(selected):
+            if j == i or ancestors[j] & bit:
+                selected ^= 1 << j
+                for r in range(num_res):
+                    used[r] -= weights[r][j]
+                if j in prev_packed_set:
+                    num_dropped += 1
+
+    if max_dropped >= 0 and num_dropped > max_dropped:
+        return None
+
+    # Usage is recomputed so it does not depend on the order in which
+    # processes were dropped
+    return selected, get_usage(weights, get_items_from_bitmask(selected))
 
 ##################################################
-def greedy_solve(weights, values, capacities, ancestors, rng=None, noise=0.0):
+def greedy_solve(weights, values, capacities, ancestors, rng=None, noise=0.0,
+                 initial_selection=None):
     n = len(values)
     num_res = len(capacities)
 
-    def weight_score(i):
-        s = 0.0
-        for r in range(num_res):
-            if capacities[r] > 0:
-                s += weights[r][i] / capacities[r]
-        return s if s > 0 else 1e-9
-
     def priority(i):
-        base = values[i] / weight_score(i)
+        base = values[i] / get_weight_score(weights, capacities, i)
         if rng is not None and noise > 0:
             # Multiplicative jitter, keeps the ranking close to the
             # deterministic one while still allowing different
@@ -293,19 +480,33 @@ def greedy_solve(weights, values, capacities, ancestors, rng=None, noise=0.0):
     # most attractive first.
     order = sorted(range(n), key=priority, reverse=True)
 
-    selected = set()
-    used = [0] * num_res
+    # Start from empty selection or from the given (selection bitmask,
+    # usage) pair
+    if initial_selection is None:
+        selected = 0
+        used = [0] * num_res
+    else:
+        selected = initial_selection[0]
+        used = list(initial_selection[1])
 
     for i in order:
-        if i in selected:
+        bit = 1 << i
+        if selected & bit:
             continue
 
-        # Bundle = this process plus any missing predecessors.
-        to_add = set(ancestors[i]) - selected
-        to_add.add(i)
+        # Bundle = this process plus any missing predecessors (the
+        # mask operations below only involve the bits of the
+        # ancestors, unlike negating the selection mask).
+        missing = ancestors[i] ^ (ancestors[i] & selected)
+        if missing:
+            to_add = missing | bit
+            to_add_items = get_items_from_bitmask(to_add)
+        else:
+            to_add = bit
+            to_add_items = [i]
 
         add_usage = [0] * num_res
-        for j in to_add:
+        for j in to_add_items:
             for r in range(num_res):
                 add_usage[r] += weights[r][j]
 
@@ -314,40 +515,344 @@ def greedy_solve(weights, values, capacities, ancestors, rng=None, noise=0.0):
             for r in range(num_res):
                 used[r] += add_usage[r]
 
-    total_value = sum(values[i] for i in selected)
-    return total_value, sorted(selected)
+    selected_items = get_items_from_bitmask(selected)
+    total_value = sum(values[i] for i in selected_items)
+    return total_value, selected_items
+
+##################################################
+def get_items_from_bitmask_numpy(bitmask):
+    # Return NumPy array with the indices of the bits set in bitmask,
+    # in increasing order
+    mask_bytes = bitmask.to_bytes((bitmask.bit_length() + 7) // 8, "little")
+    return numpy.flatnonzero(numpy.unpackbits(numpy.frombuffer(mask_bytes, dtype=numpy.uint8), bitorder="little"))
+
+##################################################
+def greedy_solve_numpy(weights, values, capacities, ancestors, rng=None, noise=0.0,
+                       initial_selection=None):
+    # NumPy version of greedy_solve. Floating point operations are
+    # performed in the same order as in the pure Python version (in
+    # particular, bundle usage is accumulated with cumsum instead of a
+    # pairwise sum), so both versions obtain the same solutions.
+    #
+    # Processes are visited in blocks. At the beginning of each block,
+    # the processes of the block that do not fit on their own given
+    # the current usage are discarded at once. Since usage can only
+    # grow, they would be rejected later anyway (this requires
+    # non-negative weights, otherwise no process is discarded)
+    n = len(values)
+    num_res = len(capacities)
+    weights_arr = numpy.array(weights, dtype=float).reshape(num_res, n)
+    weights_by_item = numpy.ascontiguousarray(weights_arr.T)
+    capacities_arr = numpy.array(capacities, dtype=float)
+
+    # Compute (possibly perturbed) value / normalized-weight ratios
+    score = numpy.zeros(n)
+    for r in range(num_res):
+        if capacities[r] > 0:
+            score += weights_arr[r] / capacities[r]
+    score[score <= 0] = 1e-9
+    priority = numpy.array(values, dtype=float) / score
+    if rng is not None and noise > 0:
+        jitter = [rng.uniform(-noise, noise) for _ in range(n)]
+        priority *= (1 + numpy.array(jitter))
+
+    # Stable sort of negated ratios keeps ties in index order, as the
+    # reverse sort of the pure Python version
+    order = numpy.argsort(-priority, kind="stable")
+
+    if initial_selection is None:
+        selected = 0
+        used = numpy.zeros(num_res)
+    else:
+        selected = initial_selection[0]
+        used = numpy.array(initial_selection[1], dtype=float)
+    discard = bool((weights_arr >= 0).all())
+
+    for block_start in range(0, n, GREEDY_NUMPY_BLOCK_SIZE):
+        block = order[block_start:block_start + GREEDY_NUMPY_BLOCK_SIZE]
+        if discard:
+            fits = ((used + weights_by_item[block]) <= capacities_arr).all(axis=1)
+            block = block[fits]
+
+        for i in block.tolist():
+            bit = 1 << i
+            if selected & bit:
+                continue
+
+            # Bundle = this process plus any missing predecessors.
+            missing = ancestors[i] ^ (ancestors[i] & selected)
+            if missing:
+                to_add = missing | bit
+                to_add_items = get_items_from_bitmask_numpy(to_add)
+                add_usage = numpy.cumsum(weights_by_item[to_add_items], axis=0)[-1]
+            else:
+                to_add = bit
+                add_usage = weights_by_item[i]
+
+            new_used = used + add_usage
+            if (new_used <= capacities_arr).all():
+                selected |= to_add
+                used = new_used
+
+    selected_items = get_items_from_bitmask_numpy(selected).tolist()
+    total_value = sum(values[i] for i in selected_items)
+    return total_value, selected_items
+
+##################################################
+def get_bundle(weights, ancestors, selected, i):
+    # Return (bitmask, usage) pair for the bundle formed by process i
+    # and its predecessors missing from selection
+    bundle = (ancestors[i] ^ (ancestors[i] & selected)) | (1 << i)
+    return bundle, get_usage(weights, get_items_from_bitmask(bundle))
+
+##################################################
+def local_search(weights, values, capacities, ancestors, selected_items,
+                 deadline=None, max_passes=LOCAL_SEARCH_MAX_PASSES):
+    # Improve solution by means of drop-add moves. Each pass tries to
+    # drop every selected process once; the search stops after a pass
+    # without improvements, after max_passes passes or when the
+    # deadline (if any) is reached. Return the improved (value, items)
+    # pair
+    n = len(values)
+    num_res = len(capacities)
+    order = sorted(range(n), key=lambda i: values[i] / get_weight_score(weights, capacities, i), reverse=True)
+
+    selected = 0
+    for i in selected_items:
+        selected |= 1 << i
+    used = get_usage(weights, selected_items)
+
+    # Bundles of unselected processes given the current selection. When
+    # refilling, they are used to discard processes that cannot fit,
+    # since bundles can only shrink as more processes are selected
+    rank = {i: pos for pos, i in enumerate(order)}
+    bundles = {}
+    for i in order:
+        if not selected & (1 << i):
+            bundles[i] = get_bundle(weights, ancestors, selected, i)
+
+    # Candidate processes sorted by usage of the first resource of
+    # their bundles, so only the ones fitting the freed capacity are
+    # visited when refilling
+    candidates = sorted((usage[0], rank[k], k) for k, (bundle, usage) in bundles.items())
+    candidate_usages = [c[0] for c in candidates]
+
+    for _ in range(max_passes):
+        improved = False
+        sel_items = get_items_from_bitmask(selected)
+
+        # Try to drop selected processes, least attractive first
+        for i in [i for i in reversed(order) if selected & (1 << i)]:
+            bit = 1 << i
+            if not selected & bit:
+                continue
+            if deadline is not None and time.time() >= deadline:
+                return sum(values[j] for j in sel_items), sel_items
+
+            # Drop process and the selected processes depending on it
+            drop = bit
+            for j in sel_items:
+                if ancestors[j] & bit:
+                    drop |= 1 << j
+            drop_items = get_items_from_bitmask(drop)
+            new_selected = selected ^ drop
+            new_used = list(used)
+            for j in drop_items:
+                for r in range(num_res):
+                    new_used[r] -= weights[r][j]
+            gain = -sum(values[j] for j in drop_items)
+
+            # Refill freed capacity with unselected processes whose
+            # bundles do not include dropped processes, in priority
+            # order
+            num_fitting = bisect.bisect_right(candidate_usages, capacities[0] - new_used[0])
+            refill = []
+            for _, k_rank, k in candidates[:num_fitting]:
+                if ancestors[k] & drop:
+                    continue
+                if any(u + w > c for u, w, c in zip(new_used, bundles[k][1], capacities)):
+                    continue
+                refill.append((k_rank, k))
+            refill.sort()
+            for _, k in refill:
+                if new_selected & (1 << k):
+                    continue
+                if any(u + w > c for u, w, c in zip(new_used, bundles[k][1], capacities)):
+                    continue
+                to_add, add_usage = get_bundle(weights, ancestors, new_selected, k)
+                if all(new_used[r] + add_usage[r] <= capacities[r] for r in range(num_res)):
+                    new_selected |= to_add
+                    for r in range(num_res):
+                        new_used[r] += add_usage[r]
+                    gain += sum(values[j] for j in get_items_from_bitmask(to_add))
+
+            # Accept move if total value increases, and go on with
+            # the remaining processes of the pass
+            if gain > 0:
+                changed = selected ^ new_selected
+                selected = new_selected
+                used = new_used
+                improved = True
+                sel_items = get_items_from_bitmask(selected)
+                for k in get_items_from_bitmask(changed):
+                    bundles.pop(k, None)
+                for k in order:
+                    kbit = 1 << k
+                    if not selected & kbit and (k not in bundles or ancestors[k] & changed):
+                        bundles[k] = get_bundle(weights, ancestors, selected, k)
+                candidates = sorted((usage[0], rank[k], k) for k, (bundle, usage) in bundles.items())
+                candidate_usages = [c[0] for c in candidates]
+
+        if not improved:
+            break
+
+    selected_items = get_items_from_bitmask(selected)
+    return sum(values[i] for i in selected_items), selected_items
+
+##################################################
+def get_greedy_solver(engine):
+    # numpy is imported here too, since worker processes of the restarts
+    # may not inherit it
+    if engine == "numpy" and import_numpy():
+        return greedy_solve_numpy
+    else:
+        return greedy_solve
+
+##################################################
+def run_restarts(restarts, weights, values, capacities, ancestors,
+                 deadline, noise, engine, initial_selection=None):
+    # Run the given (restart index, seed) pairs, stopping when the
+    # deadline (if any) is reached. Return best solution found as a
+    # (value, restart index, items) tuple, or None if no restart was
+    # run. Ties are resolved in favour of the lowest restart index
+    greedy_solver = get_greedy_solver(engine)
+    best = None
+    for restart_idx, seed in restarts:
+        if deadline is not None and time.time() >= deadline:
+            break
+
+        value, sel_items = greedy_solver(weights, values, capacities, ancestors, rng=random.Random(seed), noise=noise,
+                                         initial_selection=initial_selection)
+        if best is None or value > best[0]:
+            best = (value, restart_idx, sel_items)
+    return best
+
+##################################################
+def init_restart_worker(weights, values, capacities, ancestors, deadline, noise, engine,
+                        initial_selection):
+    # Problem data is received once per worker process instead of once
+    # per chunk of restarts
+    global restart_worker_data
+    restart_worker_data = (weights, values, capacities, ancestors, deadline, noise, engine,
+                           initial_selection)
+
+##################################################
+def run_restarts_in_worker(restarts):
+    return run_restarts(restarts, *restart_worker_data)
 
 ##################################################
 def greedy_solve_with_restarts(weights, values, capacities, ancestors,
-                               num_restarts, time_limit=-1, noise=0.25):
+                               num_restarts, time_limit=-1, noise=0.25,
+                               engine="python", num_jobs=1, seed=None,
+                               initial_selection=None):
     start = time.time()
-    rng = random.Random()
+    deadline = None
+    if time_limit is not None and time_limit > 0:
+        deadline = start + time_limit
+
+    # Obtain seed of each restart
+    seed_rng = random.Random(seed)
+    restarts = [(restart_idx, seed_rng.getrandbits(64)) for restart_idx in range(num_restarts)]
 
     # Always keep the plain deterministic greedy as a baseline; the
     # randomized restarts can only improve on it, never do worse.
-    best_value, best_items = greedy_solve(weights, values, capacities, ancestors)
+    best_value, best_items = get_greedy_solver(engine)(weights, values, capacities, ancestors,
+                                                       initial_selection=initial_selection)
+    best = (best_value, -1, best_items)
+
+    # Run restarts. When several worker processes are used, restarts
+    # are interleaved among chunks, so the first restarts are run
+    # first even if the time cap is reached
+    if num_jobs > 1 and num_restarts > 1:
+        # Only imported when needed, to reduce start-up time
+        import multiprocessing
+        num_chunks = min(num_restarts, num_jobs * RESTART_CHUNKS_PER_WORKER)
+        chunks = [restarts[c::num_chunks] for c in range(num_chunks)]
+        initargs = (weights, values, capacities, ancestors, deadline, noise, engine,
+                    initial_selection)
+        with multiprocessing.Pool(num_jobs, initializer=init_restart_worker, initargs=initargs) as pool:
+            results = pool.map(run_restarts_in_worker, chunks, chunksize=1)
+    else:
+        results = [run_restarts(restarts, weights, values, capacities, ancestors,
+                                deadline, noise, engine, initial_selection)]
 
-    for _ in range(num_restarts):
-        if time_limit is not None and time_limit > 0 and (time.time() - start) >= time_limit:
-            break
+    for result in results:
+        if result is not None and (result[0] > best[0] or (result[0] == best[0] and result[1] < best[1])):
+            best = result
 
-        value, sel_items = greedy_solve(weights, values, capacities, ancestors, rng=rng, noise=noise)
-        if value > best_value:
-            best_value, best_items = value, sel_items
+    return best[0], best[2]
 
-    return best_value, best_items
+##################################################
+def get_initial_selection(weights, values, capacities, ancestors, prev_packed_items,
+                          max_dropped=-1):
+    initial_selection = repair_solution(weights, values, capacities, ancestors,
+                                        prev_packed_items, max_dropped)
+    if initial_selection is None:
+        print("Note: more than %d processes of the previous solution should be "
+              "dropped, solving from scratch" % max_dropped, file=sys.stderr)
+    return initial_selection
 
 ##################################################
 def solve(items, weights, values, capacities, preds_by_name,
-          num_restarts=0, time_limit=-1, noise=0.25):
+          num_restarts=0, time_limit=-1, noise=0.25, engine="python",
+          num_jobs=1, seed=None, prev_packed_items=None, max_dropped=-1,
+          use_local_search=False, exact_max_items=0):
     ancestors = compute_ancestors(items, preds_by_name)
 
+    # Obtain initial selection from previous solution if given
+    initial_selection = None
+    if prev_packed_items is not None:
+        initial_selection = get_initial_selection(weights, values, capacities, ancestors,
+                                                  prev_packed_items, max_dropped)
+
+    return solve_given_ancestors(weights, values, capacities, ancestors,
+                                 num_restarts, time_limit, noise, engine,
+                                 num_jobs, seed, initial_selection, use_local_search,
+                                 exact_max_items)
+
+##################################################
+def solve_given_ancestors(weights, values, capacities, ancestors,
+                          num_restarts=0, time_limit=-1, noise=0.25,
+                          engine="python", num_jobs=1, seed=None,
+                          initial_selection=None, use_local_search=False,
+                          exact_max_items=0):
+    start = time.time()
+    deadline = None
+    if time_limit is not None and time_limit > 0:
+        deadline = start + time_limit
+
     if num_restarts is not None and num_restarts > 0:
         computed_value, packed_items = greedy_solve_with_restarts(
             weights, values, capacities, ancestors, num_restarts,
-            time_limit=time_limit, noise=noise)
+            time_limit=time_limit, noise=noise, engine=engine,
+            num_jobs=num_jobs, seed=seed, initial_selection=initial_selection)
     else:
-        computed_value, packed_items = greedy_solve(weights, values, capacities, ancestors)
+        greedy_solver = get_greedy_solver(engine)
+        computed_value, packed_items = greedy_solver(weights, values, capacities, ancestors,
+                                                     initial_selection=initial_selection)
+
+    if use_local_search:
+        computed_value, packed_items = local_search(weights, values, capacities, ancestors,
+                                                    packed_items, deadline)
+
+    # Small problems are solved exactly, starting from the solution
+    # obtained so far
+    if exact_max_items > 0 and len(values) <= exact_max_items:
+        computed_value, packed_items, optimal = knapsack_solve_exact(weights, values, capacities, ancestors,
+                                                                     packed_items, deadline)
+        if not optimal:
+            print("Note: time cap reached, the solution of the exact solver may not be optimal",
+                  file=sys.stderr)
 
     packed_weights = [0] * len(weights)
     for i in packed_items:
@@ -357,13 +862,232 @@ def solve(items, weights, values, capacities, preds_by_name,
     return computed_value, packed_items, packed_weights
 
 ##################################################
-def print_solution(items, computed_value, packed_items, packed_weights):
-    print("Value:", computed_value)
-    print("Packed items:", " ".join(items[x] for x in packed_items))
-    print("Total weights:", " ".join(str(x) for x in packed_weights))
+def print_solution(items, computed_value, packed_items, packed_weights, file=sys.stdout):
+    print("Value:", computed_value, file=file)
+    print("Packed items:", " ".join(items[x] for x in packed_items), file=file)
+    print("Total weights:", " ".join(str(x) for x in packed_weights), file=file)
+
+##################################################
+class KnapsackSolverServer:
+    def __init__(self, fifos_pref, solver_opts, warm_start=False, max_dropped=-1):
+        self.req_fifo = fifos_pref + "." + KNAPSACK_SERVER_REQ_FIFO_FEXT
+        self.sol_fifo = fifos_pref + "." + KNAPSACK_SERVER_SOL_FIFO_FEXT
+        self.solver_opts = solver_opts
+        self.warm_start = warm_start
+        self.max_dropped = max_dropped
+        self.prev_packed_names = None
+        self.items = {}
+        self.preds_by_name = {}
+        self.succs_by_name = {}
+        self.capacities = []
+
+        # Problem in the format used by the solver (item list, weights
+        # per resource, values and ancestors), updated incrementally.
+        # New items are appended, and removed items are kept as deleted
+        # slots (named None, with no value and infinite weights so they
+        # are never packed) until they outnumber the current items, in
+        # which case the problem is rebuilt. Slots whose predecessors
+        # changed are recorded in dirty_slots, and the closures
+        # affected by the changes are updated before solving
+        self.problem = None
+        self.item_index = None
+        self.direct_preds = None
+        self.dirty_slots = set()
+        self.changed_mask = 0
+        self.num_deleted = 0
+
+    def create_fifos(self):
+        for fifo in (self.req_fifo, self.sol_fifo):
+            if not os.path.exists(fifo):
+                os.mkfifo(fifo)
+
+    def run(self):
+        # Process requests until EXIT is received. The request FIFO is
+        # reopened each time all of its writers close it
+        self.create_fifos()
+        while True:
+            with open(self.req_fifo, 'r') as req_file:
+                for entry in req_file:
+                    fields = entry.split()
+                    if not fields:
+                        continue
+                    if fields[0] == "EXIT":
+                        return
+                    self.process_request(fields)
+
+    def process_request(self, fields):
+        request = fields[0]
+        try:
+            if request == "ITEM":
+                self.set_item(fields[1], float(fields[2]), [float(w) for w in fields[3:]])
+            elif request == "DEL":
+                self.del_item(fields[1])
+            elif request == "DEP":
+                preds = self.preds_by_name.setdefault(fields[1], [])
+                if fields[2] not in preds:
+                    preds.append(fields[2])
+                    self.succs_by_name.setdefault(fields[2], set()).add(fields[1])
+                    self.mark_preds_changed(fields[1])
+            elif request == "UNDEP":
+                preds = self.preds_by_name.get(fields[1], [])
+                if fields[2] in preds:
+                    preds.remove(fields[2])
+                    self.succs_by_name[fields[2]].discard(fields[1])
+                    self.mark_preds_changed(fields[1])
+            elif request == "CAP":
+                capacities = get_capacities(fields[1])
+                if len(capacities) != len(self.capacities):
+                    # Weights of the problem are stored per resource
+                    self.problem = None
+                self.capacities = capacities
+            elif request == "SOLVE":
+                self.write_solution()
+            else:
+                print("Error: unknown request", request, file=sys.stderr)
+        except (IndexError, ValueError):
+            print("Error: malformed request:", " ".join(fields), file=sys.stderr)
+
+    def mark_preds_changed(self, name):
+        # Record that the predecessors of the item changed, if the item
+        # is in the problem
+        if self.problem is not None and name in self.item_index:
+            i = self.item_index[name]
+            self.dirty_slots.add(i)
+            self.changed_mask |= 1 << i
+
+    def set_item(self, name, value, item_weights):
+        if self.problem is not None and len(item_weights) != len(self.problem[1]):
+            self.problem = None
+        if self.problem is not None:
+            items, weights, values, ancestors = self.problem
+            if name in self.item_index:
+                # Update item in place, the structure of the problem
+                # does not change
+                i = self.item_index[name]
+            else:
+                # Append item, which may be a predecessor of existing
+                # items
+                i = len(items)
+                self.item_index[name] = i
+                items.append(name)
+                values.append(0)
+                for r in range(len(weights)):
+                    weights[r].append(0)
+                ancestors.append(0)
+                self.direct_preds.append([])
+                self.dirty_slots.add(i)
+                for successor in self.succs_by_name.get(name, ()):
+                    self.mark_preds_changed(successor)
+            values[i] = value
+            for r in range(len(weights)):
+                weights[r][i] = item_weights[r]
+        self.items[name] = (value, item_weights)
+
+    def del_item(self, name):
+        if self.items.pop(name, None) is None:
+            return
+        if self.problem is None:
+            return
+        if self.num_deleted + 1 > len(self.items):
+            self.problem = None
+            return
+
+        # Keep deleted slot, which no longer constrains the items
+        # depending on it
+        items, weights, values, ancestors = self.problem
+        i = self.item_index.pop(name)
+        items[i] = None
+        values[i] = 0
+        for r in range(len(weights)):
+            weights[r][i] = float("inf")
+        ancestors[i] = 0
+        self.direct_preds[i] = []
+        self.dirty_slots.discard(i)
+        self.changed_mask |= 1 << i
+        self.num_deleted += 1
+        for successor in self.succs_by_name.get(name, ()):
+            self.mark_preds_changed(successor)
+
+    def get_direct_preds(self, name):
+        # Only predecessors among current items impose constraints
+        return [self.item_index[p] for p in self.preds_by_name.get(name, []) if p in self.item_index]
+
+    def get_problem(self):
+        # Deleted slots count as items for the exact solver, so the
+        # problem is rebuilt if they prevent solving it exactly
+        exact_max_items = self.solver_opts.get("exact_max_items", 0)
+        if self.problem is not None and len(self.problem[0]) > exact_max_items >= len(self.items):
+            self.problem = None
+
+        if self.problem is None:
+            items = list(self.items)
+            self.item_index = {name: i for i, name in enumerate(items)}
+            num_res = len(self.capacities)
+            weights = [[self.items[name][1][r] for name in items] for r in range(num_res)]
+            values = [self.items[name][0] for name in items]
+            preds_by_name = {}
+            for name in items:
+                preds_by_name[name] = [p for p in self.preds_by_name.get(name, []) if p in self.item_index]
+            ancestors = compute_ancestors(items, preds_by_name)
+            self.direct_preds = [self.get_direct_preds(name) for name in items]
+            self.dirty_slots = set()
+            self.changed_mask = 0
+            self.num_deleted = 0
+            self.problem = (items, weights, values, ancestors)
+        elif self.dirty_slots or self.changed_mask:
+            # Update closures of the changed items and of the items
+            # depending on them (according to the previous closures)
+            items, weights, values, ancestors = self.problem
+            for i in self.dirty_slots:
+                self.direct_preds[i] = self.get_direct_preds(items[i])
+            affected = set(self.dirty_slots)
+            for i in self.item_index.values():
+                if ancestors[i] & self.changed_mask:
+                    affected.add(i)
+            update_ancestors(items, self.direct_preds, ancestors, affected)
+            self.dirty_slots = set()
+            self.changed_mask = 0
+        return self.problem
+
+    def write_solution(self):
+        if any(len(item_weights) != len(self.capacities) for value, item_weights in self.items.values()):
+            print("Error: number of weights of items does not match number of capacities", file=sys.stderr)
+            items, computed_value, packed_items, packed_weights = [], 0, [], [0] * len(self.capacities)
+        else:
+            try:
+                items, weights, values, ancestors = self.get_problem()
+
+                # Warm-start from previous solution if requested
+                initial_selection = None
+                if self.warm_start and self.prev_packed_names is not None:
+                    prev_packed_items = [self.item_index[name] for name in self.prev_packed_names if name in self.item_index]
+                    initial_selection = get_initial_selection(weights, values, self.capacities, ancestors,
+                                                              prev_packed_items, self.max_dropped)
+
+                computed_value, packed_items, packed_weights = solve_given_ancestors(
+                    weights, values, self.capacities, ancestors,
+                    initial_selection=initial_selection, **self.solver_opts)
+                self.prev_packed_names = [items[i] for i in packed_items]
+            except Exception as e:
+                # A solution is always written, so the client waiting
+                # for it does not block
+                print("Error: problem could not be solved:", e, file=sys.stderr)
+                items, computed_value, packed_items, packed_weights = [], 0, [], [0] * len(self.capacities)
+        with open(self.sol_fifo, 'w') as sol_file:
+            print_solution(items, computed_value, packed_items, packed_weights, file=sol_file)
 
 ##################################################
 def process_pars(flags, values):
+    if flags["f_given"]:
+        solver_opts = {"num_restarts": values["restarts"], "time_limit": values["time"],
+                       "noise": values["noise"], "engine": values["engine"],
+                       "num_jobs": values["jobs"], "seed": values["seed"],
+                       "use_local_search": flags["l_given"],
+                       "exact_max_items": values["exact_max_items"]}
+        server = KnapsackSolverServer(values["fifos"], solver_opts, flags["w_given"], values["max_dropped"])
+        server.run()
+        return
+
     capacities = get_capacities(values["capacities"])
     items, weights, vals = extract_spec_info(values["spec"], len(capacities))
 
@@ -372,16 +1096,27 @@ def process_pars(flags, values):
     else:
         preds_by_name = {name: [] for name in items}
 
+    if flags["p_given"]:
+        prev_packed_items = extract_prev_sol_info(values["prev_sol"], items)
+    else:
+        prev_packed_items = None
+
     computed_value, packed_items, packed_weights = solve(
         items, weights, vals, capacities, preds_by_name,
-        values["restarts"], values["time"], values["noise"])
+        values["restarts"], values["time"], values["noise"], values["engine"],
+        values["jobs"], values["seed"], prev_packed_items, values["max_dropped"],
+        flags["l_given"], values["exact_max_items"])
     print_solution(items, computed_value, packed_items, packed_weights)
 
 ##################################################
 def main(argv):
     (flags, values) = take_pars()
     check_pars(flags, values)
-    process_pars(flags, values)
+    try:
+        process_pars(flags, values)
+    except ValueError as e:
+        print("Error:", e, file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":